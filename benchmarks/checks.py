@@ -0,0 +1,232 @@
+# checks.py
+"""Behaviour checks against a local mock Riot API, for guarantees a timing run can't show.
+
+    python -m benchmarks.checks            # exit status 1 if any check fails
+    python -m benchmarks.checks -k crawl -v
+
+Each check drives the real code through the mock server and reports
+whether one guarantee held:
+
+- an interactive call joining a queued backfill download is served at
+  once, past the backfill's concurrency limit or its budget;
+- a call whose deadline passes while it waits for a token never takes one;
+- a crawl whose state.json write failed resumes without writing any
+  (matchId, puuid) pair twice;
+- a match ingested twice, by sync and by the batch collector, is counted
+  into the champion rollups once.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.fixtures import BENCH_GAME_NAME, BENCH_PUUID, BENCH_TAG_LINE, generate_fixtures
+from benchmarks.mock_riot import MockRiotServer, fixture_file
+
+REGION = 'americas'
+RATE_LIMITS = '100:1'
+PROMOTED_WITHIN = 0.5  # Seconds a promoted call may take; the queue ahead of it needs several
+
+
+def _settle():
+    # Let the rate-limit windows empty, so one check's requests don't slow the next
+    time.sleep(1.1)
+
+
+def _match_paths(fixtures_dir, count):
+    with open(fixture_file(fixtures_dir, f'/lol/match/v5/matches/by-puuid/{BENCH_PUUID}/ids')) as f:
+        return [f'/lol/match/v5/matches/{match_id}' for match_id in json.load(f)[:count]]
+
+
+def _promotion(fixtures_dir, concurrency=None, budget_share=None):
+    from data_module.fetch_engine import get_fetch_engine, request_class
+    from data_module.http_client import riot_get_bytes
+
+    engine = get_fetch_engine()
+    paths = _match_paths(fixtures_dir, 100)
+    budget = engine.budget(budget_share) if budget_share else None
+    key = lambda path: ('check.match', path)
+    with request_class('backfill', tenant='check'):
+        downloads = engine.map(REGION, riot_get_bytes, paths, concurrency, key=key, budget=budget)
+        next(downloads)
+    try:
+        # The last download is at the back of the backfill queue
+        started = time.perf_counter()
+        engine.call(REGION, riot_get_bytes, paths[-1], key=key(paths[-1]))
+        elapsed = time.perf_counter() - started
+    finally:
+        downloads.close()
+    return elapsed < PROMOTED_WITHIN, f"joined the queued download in {elapsed * 1000:.0f} ms"
+
+
+def check_promotion_past_semaphore(server, fixtures_dir, work_dir):
+    """A backfill map with one download at a time; an interactive call joins its last download."""
+    return _promotion(fixtures_dir, concurrency=1)
+
+
+def check_promotion_past_budget(server, fixtures_dir, work_dir):
+    """A backfill map on a budget of 5 requests a second; an interactive call joins its last download."""
+    return _promotion(fixtures_dir, concurrency=100, budget_share=0.05)
+
+
+def check_deadline_spends_no_token(server, fixtures_dir, work_dir):
+    """Eight calls on a budget of 2 requests a second with a 1.5 s deadline: those that expire take no token."""
+    from data_module.fetch_engine import DeadlineExceeded, get_fetch_engine, request_class
+    from data_module.http_client import riot_get_bytes
+
+    engine = get_fetch_engine()
+    budget = engine.budget(0.02)
+    limiters = {'budget': budget, 'shared': engine.limiter(REGION)}
+    taken = dict.fromkeys(limiters, 0)
+
+    def counting(name, try_acquire):
+        def counted(*args):
+            wait = try_acquire(*args)
+            taken[name] += wait <= 0
+            return wait
+        return counted
+
+    for name, limiter in limiters.items():
+        limiter.try_acquire = counting(name, limiter.try_acquire)
+    sent = server.counts['requests']
+    try:
+        with request_class('backfill', tenant='check', timeout=1.5):
+            futures = [engine.submit(REGION, riot_get_bytes, path, budget=budget)
+                       for path in _match_paths(fixtures_dir, 8)]
+        errors = [future.exception() for future in futures]
+    finally:
+        for limiter in limiters.values():
+            del limiter.try_acquire
+    sent = server.counts['requests'] - sent
+    served = errors.count(None)
+    expired = sum(isinstance(error, DeadlineExceeded) for error in errors)
+    passed = expired > 0 and served + expired == len(errors) and served == sent == taken['budget'] == taken['shared']
+    return passed, (f"{served} served, {expired} expired; {sent} requests sent, "
+                    f"{taken['budget']} budget and {taken['shared']} shared tokens taken")
+
+
+def check_crawl_resume(server, fixtures_dir, work_dir):
+    """A crawl whose third state.json write fails, resumed to the end: no (matchId, puuid) pair is stored twice."""
+    from data_module import crawler
+    from data_module.match_dataset import read_matches
+
+    state_path = os.path.join(work_dir, 'crawl')
+    dataset_path = os.path.join(work_dir, 'crawl_dataset')
+    save_every, crawler.SAVE_EVERY = crawler.SAVE_EVERY, 200  # Several checkpoints before the failure
+    try:
+        first = crawler.Crawler(state_path, dataset_path, REGION, budget_share=1.0)
+        first.seed([(BENCH_GAME_NAME, BENCH_TAG_LINE)])
+        write_state = first._write_state
+        writes = []
+
+        def failing_write_state():
+            writes.append(None)
+            if len(writes) >= 3:
+                raise OSError("No space left on device")
+            write_state()
+
+        first._write_state = failing_write_state
+        try:
+            first.run(max_matches=100)
+        except OSError:
+            pass
+        finally:
+            first.close()
+        if len(writes) < 3:
+            return False, "the crawl finished before the failing checkpoint"
+
+        resumed = crawler.Crawler(state_path, dataset_path, REGION, budget_share=1.0)
+        try:
+            totals = resumed.run()
+        finally:
+            resumed.close()
+    finally:
+        crawler.SAVE_EVERY = save_every
+
+    rows = read_matches(dataset_path, columns=['matchId', 'puuid'])
+    duplicates = int(rows.duplicated().sum())
+    passed = duplicates == 0 and len(rows) == totals['rows'] and totals['frontier'] == 0
+    return passed, (f"{len(rows)} rows for {rows['matchId'].nunique()} matches after resuming, "
+                    f"{duplicates} duplicates; state counts {totals['rows']} rows")
+
+
+def check_rollups_count_once(server, fixtures_dir, work_dir):
+    """30 matches synced, then collected again by the batch collector: the rollups still count 30 games."""
+    from data_module.batch_collecter import collect_batch
+    from data_module.data_collecter import sync_match_history
+    from data_module.match_store import get_match_store
+
+    store = get_match_store()
+    rows = sync_match_history(REGION, BENCH_PUUID, count=30)
+    synced = store.rollup_totals(BENCH_PUUID)
+    collect_batch([(BENCH_GAME_NAME, BENCH_TAG_LINE)], count=30, region=REGION,
+                  dataset_path=os.path.join(work_dir, 'match_dataset'))
+    store.add_to_rollups(rows)
+    totals = store.rollup_totals(BENCH_PUUID)
+    games = sum(stats['games'] for stats in totals.values())
+    return totals == synced and games == len(rows) == 30, f"{games} games in the rollups for {len(rows)} matches"
+
+
+CHECKS = [
+    check_promotion_past_semaphore,
+    check_promotion_past_budget,
+    check_deadline_spends_no_token,
+    check_crawl_resume,
+    check_rollups_count_once,
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check scheduling, crawl and rollup guarantees against a mock Riot API.")
+    parser.add_argument('-k', dest='filter', default='', help="Only run checks whose name contains this")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Show every check's events, not just a failing one's")
+    parser.add_argument('--latency', type=float, default=0.01, help="Seconds added to every response")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='lana-checks-')
+    failed = False
+    try:
+        fixtures_dir = os.path.join(work_dir, 'fixtures')
+        generate_fixtures(fixtures_dir, matches=200, histories=True)
+        server = MockRiotServer(fixtures_dir, args.latency).start()
+
+        # The clients and config read these on first import
+        os.environ.update({
+            'RIOT_API_URL': server.riot_url,
+            'DDRAGON_URL': server.ddragon_url,
+            'RATE_LIMITS': RATE_LIMITS,
+            'API_KEY': 'checks',
+            'CACHE_DIR': os.path.join(work_dir, 'cache'),
+            'MATCH_STORE_PATH': os.path.join(work_dir, 'matches.sqlite3'),
+        })
+
+        for check in CHECKS:
+            name = check.__name__[len('check_'):]
+            if args.filter not in name:
+                continue
+            check_dir = os.path.join(work_dir, name)
+            os.makedirs(check_dir)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                try:
+                    passed, detail = check(server, fixtures_dir, check_dir)
+                except Exception as e:
+                    passed, detail = False, f"raised {type(e).__name__}: {e}"
+            failed |= not passed
+            print(f"{'OK  ' if passed else 'FAIL'} {name:30} {detail}")
+            if args.verbose or not passed:
+                print(''.join(f"       {line}\n" for line in output.getvalue().splitlines()[-20:]), end='')
+            _settle()
+        server.stop()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
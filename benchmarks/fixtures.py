@@ -0,0 +1,148 @@
+# fixtures.py
+import json
+import os
+import random
+import sys
+
+from benchmarks.mock_riot import fixture_file
+from data_set_handling.champion_mapping import champion_mapping
+
+BENCH_GAME_NAME = 'Bench'
+BENCH_TAG_LINE = 'NA1'
+BENCH_PUUID = 'bench-puuid-0000'
+DDRAGON_VERSION = '14.20.1'
+ROLES = ['TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY']
+FILLER_STATS = 90  # Extra per-participant stats, so payloads are about as large as real ones
+FILLER_CHALLENGES = 120
+
+
+def _write(fixtures_dir, path, body):
+    file_path = fixture_file(fixtures_dir, path)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'wb') as f:
+        f.write(body if isinstance(body, bytes) else json.dumps(body, separators=(',', ':')).encode())
+
+
+def _participant(rng, puuid, slot, champion_id, win):
+    participant = {
+        'puuid': puuid,
+        'participantId': slot + 1,
+        'teamId': 100 if slot < 5 else 200,
+        'championId': champion_id,
+        'championName': champion_mapping[champion_id],
+        'teamPosition': ROLES[slot % 5],
+        'win': win,
+        'kills': rng.randint(0, 15),
+        'deaths': rng.randint(0, 12),
+        'assists': rng.randint(0, 20),
+        'visionScore': rng.randint(5, 80),
+        'goldEarned': rng.randint(6000, 18000),
+        'totalMinionsKilled': rng.randint(20, 280),
+    }
+    participant.update({f'stat{i}': rng.randint(0, 50000) for i in range(FILLER_STATS)})
+    participant['challenges'] = {f'challenge{i}': rng.random() * 100 for i in range(FILLER_CHALLENGES)}
+    return participant
+
+
+def generate_fixtures(fixtures_dir, matches=300, seed=0, histories=False):
+    """Write a synthetic but realistically sized fixture set for one player.
+
+    The player (BENCH_GAME_NAME#BENCH_TAG_LINE) has `matches` games, one
+    hour apart and newest first, against nine players drawn from a shared
+    pool, plus mastery and Data Dragon champion data. Nothing is written
+    for the spectator endpoint, so the player is never in a game. With
+    histories=True the other players get match lists too (their games with
+    the player), so a participant crawl reaches past the first player.
+    """
+    rng = random.Random(seed)
+    champion_ids = sorted(champion_mapping)
+    favourites = rng.sample(champion_ids, 8)
+    others = [f'bench-puuid-{i:04d}' for i in range(1, 200)]
+    start = 1_700_000_000_000
+
+    _write(fixtures_dir, f'/riot/account/v1/accounts/by-riot-id/{BENCH_GAME_NAME}/{BENCH_TAG_LINE}',
+           {'puuid': BENCH_PUUID, 'gameName': BENCH_GAME_NAME, 'tagLine': BENCH_TAG_LINE})
+    _write(fixtures_dir, f'/lol/summoner/v4/summoners/by-puuid/{BENCH_PUUID}',
+           {'id': 'bench-summoner', 'puuid': BENCH_PUUID, 'summonerLevel': 300})
+    _write(fixtures_dir, f'/lol/champion-mastery/v4/champion-masteries/by-puuid/{BENCH_PUUID}',
+           [{'puuid': BENCH_PUUID, 'championId': champion_id, 'championLevel': 7,
+             'championPoints': 200000 - 10000 * rank} for rank, champion_id in enumerate(favourites)])
+
+    match_ids = []
+    played = {puuid: [] for puuid in others}
+    for i in range(matches):
+        match_id = f'NA1_{5000000000 - i}'
+        match_ids.append(match_id)
+        game_start = start - i * 3600 * 1000
+        puuids = [BENCH_PUUID] + rng.sample(others, 9)
+        for puuid in puuids[1:]:
+            played[puuid].append(match_id)
+        rng.shuffle(puuids)
+        picks = rng.sample(champion_ids, 10)
+        picks[puuids.index(BENCH_PUUID)] = rng.choice(favourites[:5])
+        blue_wins = rng.random() < 0.5
+        info = {
+            'gameCreation': game_start - 60000,
+            'gameStartTimestamp': game_start,
+            'gameDuration': rng.randint(900, 2400),
+            'gameVersion': f'14.{20 - i // 100}.{rng.randint(100, 999)}.1234',
+            'queueId': 420,
+            'participants': [_participant(rng, puuid, slot, picks[slot], blue_wins == (slot < 5))
+                             for slot, puuid in enumerate(puuids)],
+        }
+        _write(fixtures_dir, f'/lol/match/v5/matches/{match_id}',
+               {'metadata': {'matchId': match_id, 'participants': puuids}, 'info': info})
+    _write(fixtures_dir, f'/lol/match/v5/matches/by-puuid/{BENCH_PUUID}/ids', match_ids)
+    if histories:
+        for puuid, player_matches in played.items():
+            _write(fixtures_dir, f'/lol/match/v5/matches/by-puuid/{puuid}/ids', player_matches)
+
+    _write(fixtures_dir, '/ddragon/api/versions.json', [DDRAGON_VERSION])
+    _write(fixtures_dir, f'/ddragon/cdn/{DDRAGON_VERSION}/data/en_US/champion.json',
+           {'version': DDRAGON_VERSION,
+            'data': {name: {'key': str(champion_id), 'name': name}
+                     for champion_id, name in champion_mapping.items()}})
+
+
+def record_fixtures(fixtures_dir, game_name, tag_line, count=100, platform='na1', region='americas'):
+    """Record a real player's responses from the live API (needs API_KEY) for replay.
+
+    The benchmarks look the player up as BENCH_GAME_NAME#BENCH_TAG_LINE, so
+    the account response is also stored under that name.
+    """
+    from data_module.http_client import ddragon_client, riot_get, riot_get_bytes
+
+    account_path = f'/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}'
+    account = riot_get_bytes(region, account_path)
+    _write(fixtures_dir, account_path, account)
+    _write(fixtures_dir, f'/riot/account/v1/accounts/by-riot-id/{BENCH_GAME_NAME}/{BENCH_TAG_LINE}', account)
+    puuid = json.loads(account)['puuid']
+
+    for path in (f'/lol/summoner/v4/summoners/by-puuid/{puuid}',
+                 f'/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}'):
+        _write(fixtures_dir, path, riot_get_bytes(platform, path))
+
+    ids_path = f'/lol/match/v5/matches/by-puuid/{puuid}/ids'
+    match_ids = []
+    while len(match_ids) < count:
+        page = riot_get(region, ids_path, {'start': len(match_ids), 'count': min(100, count - len(match_ids))})
+        match_ids.extend(page)
+        if not page:
+            break
+    _write(fixtures_dir, ids_path, match_ids)
+    for match_id in match_ids:
+        path = f'/lol/match/v5/matches/{match_id}'
+        _write(fixtures_dir, path, riot_get_bytes(region, path))
+
+    version = ddragon_client().get_json('/api/versions.json')[0]
+    _write(fixtures_dir, '/ddragon/api/versions.json', [version])
+    champion_path = f'/cdn/{version}/data/en_US/champion.json'
+    _write(fixtures_dir, '/ddragon' + champion_path, ddragon_client().get(champion_path).content)
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.fixtures DIR GAME_NAME TAG_LINE [COUNT]
+    if len(sys.argv) < 4:
+        print("Usage: python -m benchmarks.fixtures DIR GAME_NAME TAG_LINE [COUNT]")
+        sys.exit(1)
+    record_fixtures(sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4]) if len(sys.argv) > 4 else 100)
@@ -0,0 +1,204 @@
+# mock_riot.py
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from urllib.request import urlopen
+
+RIOT_PREFIX = '/riot-api'  # Riot API paths are served under /riot-api/{region}
+DDRAGON_PREFIX = '/ddragon'
+CONTROL_PREFIX = '/__mock__'  # Fault counters, for a server running in another process
+
+
+def fixture_file(fixtures_dir, path):
+    """Where the recorded response for an API path (without region) is kept."""
+    path = unquote(path).lstrip('/')
+    return os.path.join(fixtures_dir, path if path.endswith('.json') else path + '.json')
+
+
+class MockRiotServer:
+    """Local stand-in for the Riot API and Data Dragon that replays fixtures.
+
+    Responses come from files under `fixtures_dir` (see fixture_file).
+    Match ID lists are stored whole and paged here, honouring start, count,
+    startTime and endTime like the real endpoint. Every request waits
+    `latency` seconds plus up to `jitter` more, then fails with a 429 (with
+    Retry-After) with probability `error_429` or a 503 with probability
+    `error_5xx`. Faults are drawn from a seeded generator, so a run can be
+    repeated exactly.
+
+    By default the server runs in a child process so that serving requests
+    doesn't compete for the GIL with the code being measured.
+    """
+
+    def __init__(self, fixtures_dir, latency=0.0, jitter=0.0, error_429=0.0, error_5xx=0.0,
+                 retry_after=1, seed=0):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = {}
+        self._game_starts = {}
+        self._counts = {'requests': 0, 'rate_limited': 0, 'server_errors': 0, 'not_found': 0}
+        self._server = None
+        self._process = None
+        self.port = None
+
+    @property
+    def riot_url(self):
+        return f'http://127.0.0.1:{self.port}{RIOT_PREFIX}/{{region}}'
+
+    @property
+    def ddragon_url(self):
+        return f'http://127.0.0.1:{self.port}{DDRAGON_PREFIX}'
+
+    @property
+    def counts(self):
+        """Requests served so far, and how many were faults or 404s."""
+        if self._process is None:
+            with self._lock:
+                return dict(self._counts)
+        with urlopen(f'http://127.0.0.1:{self.port}{CONTROL_PREFIX}/counts') as response:
+            return json.loads(response.read())
+
+    def reset_counts(self):
+        if self._process is None:
+            with self._lock:
+                for key in self._counts:
+                    self._counts[key] = 0
+        else:
+            urlopen(f'http://127.0.0.1:{self.port}{CONTROL_PREFIX}/reset').close()
+
+    def start(self, in_process=False):
+        """Start serving on a free port; returns self."""
+        if in_process:
+            self._serve()
+            return self
+        parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=self._serve_in_child, args=(child,), daemon=True)
+        self._process.start()
+        self.port = parent.recv()
+        return self
+
+    def _serve_in_child(self, conn):
+        self._serve()
+        conn.send(self.port)
+        threading.Event().wait()  # Serve until the parent terminates this process
+
+    def _serve(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, headers, body = server.respond(self.path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def _body(self, path):
+        # Cached raw bytes of a fixture, or None if there is no recording for it
+        with self._lock:
+            if path in self._bodies:
+                return self._bodies[path]
+        try:
+            with open(fixture_file(self.fixtures_dir, path), 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            body = None
+        with self._lock:
+            self._bodies[path] = body
+        return body
+
+    def _game_start(self, match_id):
+        # Seconds since the epoch, read from the match fixture for time-filtered ID lists
+        if match_id not in self._game_starts:
+            body = self._body(f'/lol/match/v5/matches/{match_id}')
+            info = json.loads(body)['info'] if body else {}
+            self._game_starts[match_id] = info.get('gameStartTimestamp', info.get('gameCreation', 0)) // 1000
+        return self._game_starts[match_id]
+
+    def _match_ids(self, path, query):
+        body = self._body(path)
+        if body is None:
+            return None
+        match_ids = json.loads(body)
+        if 'startTime' in query or 'endTime' in query:
+            start_time = int(query.get('startTime', 0))
+            end_time = int(query.get('endTime', 2 ** 63))
+            match_ids = [match_id for match_id in match_ids
+                         if start_time <= self._game_start(match_id) <= end_time]
+        start = int(query.get('start', 0))
+        return json.dumps(match_ids[start:start + int(query.get('count', 20))]).encode()
+
+    def respond(self, raw_path):
+        """(status, headers, body) for a request path, after latency and fault injection."""
+        if raw_path.startswith(CONTROL_PREFIX):
+            if raw_path.endswith('/reset'):
+                with self._lock:
+                    for key in self._counts:
+                        self._counts[key] = 0
+            with self._lock:
+                return 200, {}, json.dumps(self._counts).encode()
+        self._count('requests')
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fault = self._random.random()
+        if delay:
+            time.sleep(delay)
+        if fault < self.error_429:
+            self._count('rate_limited')
+            return 429, {'Retry-After': str(self.retry_after)}, b'{"status": {"status_code": 429}}'
+        if fault < self.error_429 + self.error_5xx:
+            self._count('server_errors')
+            return 503, {}, b'{"status": {"status_code": 503}}'
+
+        url = urlparse(raw_path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path.startswith(RIOT_PREFIX + '/'):
+            path = '/' + url.path[len(RIOT_PREFIX) + 1:].split('/', 1)[-1]
+        else:
+            path = url.path
+        if path.endswith('/ids') and '/matches/by-puuid/' in path:
+            body = self._match_ids(path, query)
+        else:
+            body = self._body(path)
+        if body is None:
+            self._count('not_found')
+            return 404, {}, b'{"status": {"status_code": 404}}'
+        return 200, {}, body
@@ -0,0 +1,289 @@
+# run.py
+"""Benchmarks for the fetch paths and data processing, against a local mock Riot API.
+
+    python -m benchmarks.run                      # every benchmark, synthetic fixtures
+    python -m benchmarks.run -k champion --latency 0.02 --jitter 0.01
+    python -m benchmarks.run --error-429 0.05 --error-5xx 0.02
+    python -m benchmarks.run --fixtures recorded/ # replay fixtures from benchmarks.fixtures
+    python -m benchmarks.run --compare benchmarks/results/<earlier run>.json
+
+Results are written to benchmarks/results/ as JSON, named after the commit.
+"""
+import argparse
+import contextlib
+import datetime
+import functools
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.fixtures import BENCH_GAME_NAME, BENCH_PUUID, BENCH_TAG_LINE, generate_fixtures
+from benchmarks.mock_riot import MockRiotServer
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Benchmark:
+    """One benchmarked call. `setup` runs untimed before every iteration and
+    returns the call's arguments; `units` is how many items one call handles."""
+
+    def __init__(self, name, fn, setup=None, units=1, unit='calls'):
+        self.name = name
+        self.fn = fn
+        self.setup = setup or (lambda: ())
+        self.units = units
+        self.unit = unit
+
+
+class RssSampler:
+    """Highest resident set size seen while active, sampled from /proc (Linux only).
+
+    tracemalloc only sees Python allocations; this also catches NumPy,
+    Arrow and SQLite memory.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def _rss(self):
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * self._page_size
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._rss())
+
+    def __enter__(self):
+        if os.path.exists('/proc/self/statm'):
+            self.baseline = self.peak = self._rss()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.peak is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, self._rss())
+
+    @property
+    def growth_mb(self):
+        return None if self.peak is None else (self.peak - self.baseline) / 2 ** 20
+
+
+def _reset_state(work_dir, warm):
+    # Point the match store, lookup cache and Data Dragon cache at empty locations for a cold run
+    from data_module import champion_data, lookup_cache, match_store
+
+    if warm and match_store._store is not None:
+        return
+    run_dir = tempfile.mkdtemp(dir=work_dir)
+    match_store._store = match_store.MatchStore(os.path.join(run_dir, 'matches.sqlite3'))
+    lookup_cache._cache = lookup_cache.LookupCache(path=os.path.join(run_dir, 'lookups.sqlite3'))
+    champion_data._current, champion_data._checked_at = None, 0.0
+    shutil.rmtree(champion_data.DDRAGON_CACHE_DIR, ignore_errors=True)
+
+
+def _benchmarks(args, work_dir):
+    import pandas as pd
+
+    from data_module.data_collecter import (
+        get_champion_specific_matches_batch, get_champion_stats, retrieve_match_data,
+    )
+    from data_module.data_processing import calculate_metrics, feature_engineering, load_data, save_data
+    from data_module.match_records import ParticipantRecord
+
+    def fetch_setup():
+        _reset_state(work_dir, args.warm)
+        return ()
+
+    n = args.rows
+
+    @functools.lru_cache(maxsize=None)
+    def processing_inputs():
+        # Built on first use, so fetch-only runs don't pay for writing the dataset
+        rng = np.random.default_rng(0)
+        rows = [
+            ParticipantRecord(f'NA1_{i // 10}', f'puuid{i % 50}', 1_700_000_000_000 + i * 360_000,
+                              bool(rng.random() < 0.5), int(rng.integers(900, 2400)), int(rng.integers(0, 15)),
+                              int(rng.integers(0, 12)), int(rng.integers(0, 20)), int(rng.integers(1, 900)),
+                              ('TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY')[i % 5], int(rng.integers(5, 80)),
+                              f'14.{i % 20 + 1}')
+            for i in range(n)
+        ]
+        frame = pd.DataFrame(rows, columns=ParticipantRecord._fields)
+        dataset = os.path.join(work_dir, 'dataset')
+        save_data(rows, dataset)
+        return rows, frame, dataset
+
+    return [
+        Benchmark('retrieve_match_data', lambda: retrieve_match_data(BENCH_GAME_NAME, BENCH_TAG_LINE, args.count),
+                  fetch_setup, args.count, 'matches'),
+        Benchmark('get_champion_stats', lambda: get_champion_stats(BENCH_GAME_NAME, BENCH_TAG_LINE),
+                  fetch_setup),
+        Benchmark('get_champion_stats_single_pass',
+                  lambda: get_champion_stats(BENCH_GAME_NAME, BENCH_TAG_LINE, single_pass=True), fetch_setup),
+        Benchmark('get_champion_specific_matches_batch',
+                  lambda: get_champion_specific_matches_batch('americas', BENCH_PUUID, args.count),
+                  fetch_setup, args.count, 'matches'),
+        Benchmark('save_data', lambda rows, path: save_data(rows, path),
+                  lambda: (processing_inputs()[0], tempfile.mkdtemp(dir=work_dir)), n, 'rows'),
+        Benchmark('load_data', load_data, lambda: (processing_inputs()[2],), n, 'rows'),
+        Benchmark('calculate_metrics', calculate_metrics, lambda: (processing_inputs()[1],), n, 'rows'),
+        Benchmark('feature_engineering', feature_engineering,
+                  lambda: (processing_inputs()[1].copy(),), n, 'rows'),
+    ]
+
+
+def run_benchmark(benchmark, server, iterations, warmup):
+    """Time a benchmark and measure its peak memory in one extra traced call."""
+    timings = []
+    requests_made = []
+    for i in range(warmup + iterations):
+        call_args = benchmark.setup()
+        server.reset_counts()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            benchmark.fn(*call_args)
+            elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed)
+            requests_made.append(server.counts['requests'])
+    faults = dict(server.counts)
+
+    call_args = benchmark.setup()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()), RssSampler() as rss:
+        benchmark.fn(*call_args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        'iterations': iterations,
+        'p50_ms': float(np.percentile(timings, 50) * 1000),
+        'p99_ms': float(np.percentile(timings, 99) * 1000),
+        'mean_ms': float(timings.mean() * 1000),
+        'calls_per_s': float(1 / timings.mean()),
+        'throughput': float(benchmark.units / timings.mean()),
+        'unit': f'{benchmark.unit}/s',
+        'api_requests': float(np.mean(requests_made)),
+        'last_faults': faults,
+        'peak_memory_mb': peak / 2 ** 20,  # Python allocations
+        'peak_rss_growth_mb': rss.growth_mb,  # Whole process, None off Linux
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline.get('commit', '?')[:10]} ({baseline_path}):")
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = result['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0.0
+        memory = result['peak_memory_mb'] - before['peak_memory_mb']
+        print(f"  {name:40} p50 {before['p50_ms']:9.2f} -> {result['p50_ms']:9.2f} ms "
+              f"({change:+.1%}), peak memory {memory:+.2f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fetch and processing paths against a mock Riot API.")
+    parser.add_argument('-k', dest='filter', default='', help="Only run benchmarks whose name contains this")
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--count', type=int, default=100, help="Matches requested by the fetch benchmarks")
+    parser.add_argument('--rows', type=int, default=20_000, help="Rows for the data_processing benchmarks")
+    parser.add_argument('--warm', action='store_true', help="Keep the match store between iterations")
+    parser.add_argument('--fixtures', help="Directory of recorded fixtures (default: generate synthetic ones)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra seconds per response")
+    parser.add_argument('--error-429', type=float, default=0.0, help="Fraction of responses that are 429s")
+    parser.add_argument('--error-5xx', type=float, default=0.0, help="Fraction of responses that are 503s")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--rate-limits', default='100000:1',
+                        help="RATE_LIMITS for the run (the default keeps the limiter out of the way)")
+    parser.add_argument('--in-process-server', action='store_true',
+                        help="Serve the mock API from a thread in this process instead of a child process")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='lana-bench-')
+    try:
+        fixtures_dir = args.fixtures
+        if fixtures_dir is None:
+            fixtures_dir = os.path.join(work_dir, 'fixtures')
+            generate_fixtures(fixtures_dir, matches=max(args.count, 100))
+        server = MockRiotServer(fixtures_dir, args.latency, args.jitter, args.error_429, args.error_5xx,
+                                args.retry_after, args.seed).start(args.in_process_server)
+
+        # The clients and config read these on first import
+        os.environ.update({
+            'RIOT_API_URL': server.riot_url,
+            'DDRAGON_URL': server.ddragon_url,
+            'RATE_LIMITS': args.rate_limits,
+            'API_KEY': 'benchmark',
+            'CACHE_DIR': os.path.join(work_dir, 'cache'),
+            'MATCH_DATASET_PATH': os.path.join(work_dir, 'match_dataset'),
+        })
+
+        results = {}
+        for benchmark in _benchmarks(args, work_dir):
+            if args.filter not in benchmark.name:
+                continue
+            result = run_benchmark(benchmark, server, args.iterations, args.warmup)
+            results[benchmark.name] = result
+            print(f"{benchmark.name:40} p50 {result['p50_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms  "
+                  f"{result['throughput']:12.1f} {result['unit']:10}  "
+                  f"peak {result['peak_memory_mb']:8.2f} MB (rss +{result['peak_rss_growth_mb'] or 0:.1f} MB)  requests {result['api_requests']:.0f}")
+        server.stop()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    commit = _git('rev-parse', 'HEAD')
+    report = {
+        'commit': commit,
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'settings': vars(args),
+        'results': results,
+    }
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{commit[:8] or 'nogit'}.json")
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {path}")
+    if args.compare:
+        compare(results, args.compare)
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(main() and 0)
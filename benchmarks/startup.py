@@ -0,0 +1,111 @@
+# startup.py
+"""Import-time benchmark with a regression budget.
+
+    python -m benchmarks.startup             # fails (exit 1) if a budget is exceeded
+    python -m benchmarks.startup --repeat 9 --scale 2   # slower machine: double every budget
+
+Each entry point is imported in a fresh interpreter several times; the
+median wall time is checked against its budget, and modules that must not
+be loaded at import (pandas for the CLI, scikit-learn for the model, ...)
+are checked too. The slowest imports by self time come from -X importtime.
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.run import RESULTS_DIR, _git
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('pandas', 'numpy', 'pyarrow', 'scipy', 'sklearn', 'joblib')
+
+# (module, budget in ms, top-level packages it must not import)
+BUDGETS = [
+    ('main', 60, HEAVY + ('requests', 'data_module')),
+    ('data_module.data_collecter', 250, HEAVY),
+    ('data_module.prediction_model', 900, ('sklearn', 'joblib')),
+    ('data_module.live_scoring', 900, ('sklearn', 'joblib')),
+]
+
+_PROBE = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - started\n"
+    "print(json.dumps({{'ms': elapsed * 1000, 'modules': sorted({{m.split('.')[0] for m in sys.modules}})}}))\n"
+)
+
+
+def _probe(module, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', _PROBE.format(module=module)]
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def _slowest(importtime_output, count):
+    # Lines look like "import time:  self [us] | cumulative | module"
+    entries = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        entries.append((int(self_us), name.strip()))
+    return [{'module': name, 'self_ms': us / 1000} for us, name in sorted(entries, reverse=True)[:count]]
+
+
+def measure(module, budget, forbidden, repeat=5, scale=1.0):
+    """Median import time of a module in fresh interpreters, checked against its budget."""
+    timings = []
+    for _ in range(repeat):
+        probe, _ = _probe(module)
+        timings.append(probe['ms'])
+    _, importtime = _probe(module, importtime=True)
+    loaded = sorted(set(forbidden) & set(probe['modules']))
+    median = statistics.median(timings)
+    return {
+        'module': module,
+        'median_ms': median,
+        'min_ms': min(timings),
+        'budget_ms': budget * scale,
+        'over_budget': median > budget * scale,
+        'forbidden_loaded': loaded,
+        'slowest': _slowest(importtime, 5),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check import times against their budgets.")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply every budget, for slower machines")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = []
+    failed = False
+    for module, budget, forbidden in BUDGETS:
+        result = measure(module, budget, forbidden, args.repeat, args.scale)
+        results.append(result)
+        status = 'OK  '
+        if result['over_budget'] or result['forbidden_loaded']:
+            status, failed = 'FAIL', True
+        print(f"{status} {module:32} {result['median_ms']:8.1f} ms (budget {result['budget_ms']:.0f} ms)"
+              + (f"  loads {', '.join(result['forbidden_loaded'])}" if result['forbidden_loaded'] else ''))
+        for entry in result['slowest']:
+            print(f"       {entry['self_ms']:8.1f} ms  {entry['module']}")
+
+    if not args.no_save:
+        commit = _git('rev-parse', 'HEAD')
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(RESULTS_DIR, f"startup-{stamp}-{commit[:8] or 'nogit'}.json")
+        with open(path, 'w') as f:
+            json.dump({'commit': commit, 'settings': vars(args), 'results': results}, f, indent=2)
+        print(f"\nSaved {path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,3 +4,88 @@ import os
 load_dotenv()  # Load environment variables from .env file
 API_KEY = os.getenv("API_KEY")  # Correct way to retrieve the API key
 
+# Local cache of finished matches, shared by every match fetch
+MATCH_STORE_PATH = os.getenv("MATCH_STORE_PATH", "match_store.sqlite3")
+
+# Application rate limits as "requests:seconds" windows (development key defaults)
+RATE_LIMITS = [
+    tuple(int(value) for value in window.split(":"))
+    for window in os.getenv("RATE_LIMITS", "20:1,100:120").split(",")
+]
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "10"))  # In-flight requests per call
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "3"))
+INTERACTIVE_RESERVE = float(os.getenv("INTERACTIVE_RESERVE", "0.1"))  # Share of each window only interactive calls may take
+
+# API base URLs; override to point the clients at a mirror or a local mock server
+RIOT_API_URL = os.getenv("RIOT_API_URL", "https://{region}.api.riotgames.com")
+DDRAGON_URL = os.getenv("DDRAGON_URL", "https://ddragon.leagueoflegends.com")
+
+# Pooled HTTP client settings
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))  # Kept-alive connections per host
+
+# Directory for on-disk caches (Data Dragon, ...)
+CACHE_DIR = os.getenv("CACHE_DIR", ".lana_cache")
+DDRAGON_CHECK_INTERVAL = float(os.getenv("DDRAGON_CHECK_INTERVAL", str(6 * 60 * 60)))  # Seconds between patch checks
+DDRAGON_RETRY_INTERVAL = float(os.getenv("DDRAGON_RETRY_INTERVAL", "60"))  # Seconds before a failed check is retried
+
+# Account, summoner, mastery and spectator lookup cache: seconds an answer stays fresh per endpoint
+LOOKUP_TTLS = {
+    name: float(seconds)
+    for name, seconds in (
+        item.split("=") for item in os.getenv(
+            "LOOKUP_TTLS",
+            "account.by_riot_id=86400,summoner.by_puuid=86400,mastery.by_puuid=3600,spectator.active_game=20",
+        ).split(",")
+    )
+}
+LOOKUP_NEGATIVE_TTL = float(os.getenv("LOOKUP_NEGATIVE_TTL", "30"))  # Seconds a 404 is remembered
+LOOKUP_STALE_FACTOR = float(os.getenv("LOOKUP_STALE_FACTOR", "1"))  # Expired answers are served, and refreshed, for this many TTLs more
+LOOKUP_CACHE_SIZE = int(os.getenv("LOOKUP_CACHE_SIZE", "10000"))  # Entries kept in memory
+LOOKUP_CACHE_PATH = os.getenv("LOOKUP_CACHE_PATH", os.path.join(CACHE_DIR, "lookups.sqlite3"))  # Shared disk tier; empty disables it
+
+# Partitioned Parquet dataset of participant rows written by save_data
+MATCH_DATASET_PATH = os.getenv("MATCH_DATASET_PATH", "match_dataset")
+DATASET_BUCKETS = int(os.getenv("DATASET_BUCKETS", "16"))  # Players are spread over this many partitions by hash; fixed once a dataset exists
+DATASET_COMPACT_FILES = int(os.getenv("DATASET_COMPACT_FILES", "8"))  # Small files a partition may collect before they are merged
+DATASET_COMPACT_BYTES = int(os.getenv("DATASET_COMPACT_BYTES", str(16 * 1024 * 1024)))  # Files smaller than this count as small
+
+# Incremental sync looks this many seconds before the last sync, to catch games still in progress then
+SYNC_OVERLAP = int(os.getenv("SYNC_OVERLAP", "3600"))
+
+# Participant-graph crawler: resumable state, output dataset and share of the rate limits it may use
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", "crawl")
+CRAWL_DATASET_PATH = os.getenv("CRAWL_DATASET_PATH", "crawl_dataset")  # Same schema as MATCH_DATASET_PATH, partitioned by day
+CRAWL_BUDGET_SHARE = float(os.getenv("CRAWL_BUDGET_SHARE", "0.5"))
+CRAWL_MATCHES_PER_PLAYER = int(os.getenv("CRAWL_MATCHES_PER_PLAYER", "20"))
+CRAWL_CAPACITY = int(os.getenv("CRAWL_CAPACITY", "10000000"))  # Matches (and players) the seen-filters are sized for
+
+# Watchlist spectator monitor: seconds between polls by player activity, and its share of the rate limits
+MONITOR_ACTIVE_INTERVAL = float(os.getenv("MONITOR_ACTIVE_INTERVAL", "10"))  # Players out of a game recently, likely queueing
+MONITOR_IN_GAME_INTERVAL = float(os.getenv("MONITOR_IN_GAME_INTERVAL", "30"))  # Players in a game, polled to see it end
+MONITOR_IDLE_MAX_INTERVAL = float(os.getenv("MONITOR_IDLE_MAX_INTERVAL", "600"))  # Idle players back off up to this
+MONITOR_ACTIVE_WINDOW = float(os.getenv("MONITOR_ACTIVE_WINDOW", "1800"))  # How long after a game a player counts as active
+MONITOR_INGEST_DELAY = float(os.getenv("MONITOR_INGEST_DELAY", "60"))  # Wait after a game ends before fetching the match
+MONITOR_BUDGET_SHARE = float(os.getenv("MONITOR_BUDGET_SHARE", "0.3"))
+
+# Saved win-prediction models and cached feature matrices
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+RETRAIN_MIN_NEW_MATCHES = int(os.getenv("RETRAIN_MIN_NEW_MATCHES", "200"))  # New rows needed before retraining
+MODEL_MAX_DEPTH = int(os.getenv("MODEL_MAX_DEPTH", "16"))  # Bounds per-tick cost of live scoring
+
+# Seconds between live client polls
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "0.1"))
+
+# Memory-mapped per-minute match timelines
+TIMELINE_STORE_PATH = os.getenv("TIMELINE_STORE_PATH", "timelines")
+TIMELINE_MAX_MINUTES = int(os.getenv("TIMELINE_MAX_MINUTES", "60"))  # Frames kept per match
+
+# Instrumentation: "json" prints events as JSON lines; PROFILE_DIR enables cProfile per pipeline stage
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+
+# Local API server started with `main.py --serve`
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8765"))
+SERVICE_REQUEST_TIMEOUT = float(os.getenv("SERVICE_REQUEST_TIMEOUT", "30"))  # Seconds a request may wait for rate-limit tokens
@@ -0,0 +1,93 @@
+# analytics.py
+import pandas as pd
+
+from data_module.data_processing import load_data
+
+# Columns summed per group; 'win' is a bool, so its sum is the win count
+TOTAL_COLUMNS = ['win', 'kills', 'deaths', 'assists', 'vision_score', 'duration']
+PER_GAME_COLUMNS = ['kills', 'deaths', 'assists', 'vision_score']
+
+
+def _with_rates(totals):
+    """Add win rate, KDA and per-game averages to a frame of per-group totals."""
+    games = totals['games']
+    played = games.where(games > 0)  # Avoid dividing by zero for empty groups
+    totals['win_rate'] = (totals['wins'] / played * 100).fillna(0)
+    totals['kda'] = (totals['kills'] + totals['assists']) / totals['deaths'].clip(lower=1)
+    for column in PER_GAME_COLUMNS:
+        if column in totals:
+            totals[f'{column}_per_game'] = (totals[column] / played).fillna(0)
+    if 'duration' in totals:
+        totals['minutes_per_game'] = (totals['duration'] / played / 60).fillna(0)
+    return totals
+
+def summarize(match_data, by=('championId',)):
+    """Grouped totals, win rate, KDA and per-game averages in one pass.
+
+    `by` can be any mix of championId, role and patch. KDA is computed from
+    the group totals, (kills + assists) / max(1, deaths), like the match
+    loops in data_collecter used to. Returns a frame indexed by `by`.
+    """
+    by = list(by)
+    columns = [column for column in TOTAL_COLUMNS if column in match_data]
+    grouped = match_data.groupby(by, observed=True, sort=False)
+    totals = grouped[columns].sum()
+    totals.insert(0, 'games', grouped.size())
+    totals = totals.rename(columns={'win': 'wins'})
+    return _with_rates(totals)
+
+def summarize_rows(rows, by=('championId',), groups=None):
+    """summarize() for a list of match rows, as returned by data_collecter.
+
+    When `groups` is given the result has exactly those groups, with zeros
+    for groups that have no games.
+    """
+    if rows:
+        summary = summarize(pd.DataFrame(rows), by)
+    else:
+        summary = pd.DataFrame(columns=['games', 'wins'] + TOTAL_COLUMNS[1:])
+        summary.index.name = by[0] if len(by) == 1 else None
+    if groups is not None:
+        summary = summary.reindex(groups)
+        summary[['games', 'wins'] + TOTAL_COLUMNS[1:]] = summary[['games', 'wins'] + TOTAL_COLUMNS[1:]].fillna(0)
+        summary = _with_rates(summary)
+    return summary
+
+def summarize_totals(totals, groups=None, name='championId'):
+    """Win rate, KDA and per-game averages from precomputed totals ({group: {games, wins, ...}}).
+
+    The counterpart of summarize_rows for the match store's rollups: the
+    work is one row per group, however many games went into the totals.
+    """
+    summary = pd.DataFrame.from_dict(totals, orient='index', columns=['games', 'wins'] + TOTAL_COLUMNS[1:])
+    summary.index.name = name
+    if groups is not None:
+        summary = summary.reindex(groups).fillna(0)
+    return _with_rates(summary)
+
+def rolling_trends(match_data, window=10, by=('championId',)):
+    """Rolling `window`-game win rate and KDA for each group, in game order.
+
+    Returns the input rows sorted by gameCreation with rolling_win_rate and
+    rolling_kda columns added.
+    """
+    by = list(by)
+    data = match_data.sort_values('gameCreation', kind='stable').reset_index(drop=True)
+    rolled = (
+        data.groupby(by, observed=True, sort=False)[['win', 'kills', 'deaths', 'assists']]
+        .rolling(window, min_periods=1)
+        .sum()
+        .reset_index(level=list(range(len(by))), drop=True)
+        .sort_index()
+    )
+    games = (
+        data.groupby(by, observed=True, sort=False).cumcount().add(1).clip(upper=window)
+    )
+    data['rolling_win_rate'] = rolled['win'] / games * 100
+    data['rolling_kda'] = (rolled['kills'] + rolled['assists']) / rolled['deaths'].clip(lower=1)
+    return data
+
+def rollup(dataset_path, by=('championId', 'role', 'patch'), puuid=None):
+    """Summarize the match dataset, reading only the columns the summary needs."""
+    columns = list(dict.fromkeys(list(by) + TOTAL_COLUMNS))
+    return summarize(load_data(dataset_path, columns=columns, puuid=puuid), by)
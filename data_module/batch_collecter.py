@@ -0,0 +1,90 @@
+# batch_collecter.py
+import concurrent.futures
+import functools
+
+from config.config import MATCH_DATASET_PATH, FETCH_CONCURRENCY
+from data_module.data_collecter import get_summoner_puuid_by_riot_id, get_match_ids, iter_match_data
+from data_module.fetch_engine import carry_request_class, request_class
+from data_module.http_client import RiotAPIError
+from data_module.match_dataset import append_matches
+from data_module.match_store import get_match_store
+from data_module.match_records import extract_participants
+from data_module.metrics import event
+
+SAVE_EVERY = 5000  # Records buffered before appending to the dataset
+
+
+def read_riot_ids(path):
+    """Read Riot IDs ("GameName#TAG"), one per line. Blank lines and # comments are skipped."""
+    riot_ids = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '#' in line:
+                game_name, tag_line = line.rsplit('#', 1)
+                riot_ids.append((game_name, tag_line))
+    return riot_ids
+
+def resolve_puuids(riot_ids, concurrency=FETCH_CONCURRENCY):
+    """Resolve Riot IDs to PUUIDs concurrently. Returns {(game_name, tag_line): puuid}."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        puuids = executor.map(carry_request_class(lambda riot_id: get_summoner_puuid_by_riot_id(*riot_id)), riot_ids)
+        return {riot_id: puuid for riot_id, puuid in zip(riot_ids, puuids) if puuid}
+
+def _list_match_ids(region, puuid, count):
+    try:
+        return get_match_ids(region, puuid, count=count)
+    except RiotAPIError as err:
+        event('match_list_error', f"Failed to retrieve match list for {puuid}: {err}", level='error',
+              puuid=puuid, error=str(err))
+        return []
+
+def _extract_tracked(raw, puuids):
+    try:
+        return extract_participants(raw, puuids)
+    except Exception as e:
+        event('match_error', f"Error processing match: {e}", level='error', error=str(e))
+        return []
+
+def collect_batch(riot_ids, count=20, region='americas', dataset_path=MATCH_DATASET_PATH, concurrency=None):
+    """Fetch recent matches for many players, downloading each shared match once.
+
+    Match IDs from every player are merged first. Each unique match is
+    downloaded once and split into a record for every tracked player who
+    played in it, so teammates who share games share the download. Records
+    are appended to the match dataset and counted into the champion rollups
+    as they arrive. Requests run as backfill, behind interactive lookups.
+    """
+    with request_class('backfill'):
+        event('batch_resolving', f"Resolving {len(riot_ids)} Riot IDs...", riot_ids=len(riot_ids))
+        puuids = resolve_puuids(riot_ids, concurrency or FETCH_CONCURRENCY)
+        tracked = frozenset(puuids.values())
+        event('batch_resolved', f"Resolved {len(tracked)} players.", players=len(tracked))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency or FETCH_CONCURRENCY) as executor:
+            match_lists = list(executor.map(carry_request_class(lambda puuid: _list_match_ids(region, puuid, count)),
+                                            tracked))
+        match_ids = list(dict.fromkeys(match_id for match_list in match_lists for match_id in match_list))
+        listed = sum(len(match_list) for match_list in match_lists)
+        event('batch_matches_listed', f"{listed} player matches share {len(match_ids)} unique matches.",
+              player_matches=listed, unique_matches=len(match_ids))
+
+        extract = functools.partial(_extract_tracked, puuids=tracked)
+        pending = []
+        rows_written = 0
+        store = get_match_store()
+        for records in iter_match_data(region, match_ids, concurrency, extract):
+            store.add_to_rollups(records)
+            pending.extend(records)
+            if len(pending) >= SAVE_EVERY:
+                rows_written += append_matches(pending, dataset_path)
+                pending = []
+        if pending:
+            rows_written += append_matches(pending, dataset_path)
+
+    return {
+        'players': len(tracked),
+        'player_matches': listed,
+        'unique_matches': len(match_ids),
+        'rows_written': rows_written,
+    }
@@ -0,0 +1,70 @@
+# bloom_filter.py
+import hashlib
+import math
+import os
+
+import numpy as np
+
+
+class BloomFilter:
+    """Set membership for millions of string IDs in a fixed bit array.
+
+    Sized for `capacity` items at a false positive rate of `error_rate`
+    (about 14.4 bits per item at 0.1%), whatever the IDs' length. It never
+    forgets an item; it may wrongly report an unseen one as present, at
+    about `error_rate` until `capacity` items have been added. The bits are
+    a NumPy array, checked and set for a whole batch of IDs at once.
+    """
+
+    def __init__(self, capacity, error_rate=0.001, bits=None, hashes=None, count=0):
+        self.size = bits if bits is not None else max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes if hashes is not None else max(1, round(self.size / max(capacity, 1) * math.log(2)))
+        self.count = count
+        self._bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, items):
+        # Double hashing: position i of an item is h1 + i * h2, from one 128-bit digest
+        digests = b''.join(hashlib.blake2b(item.encode(), digest_size=16).digest() for item in items)
+        pairs = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        return (pairs[:, :1] + steps * pairs[:, 1:]) % np.uint64(self.size)
+
+    def contains_many(self, items):
+        """Boolean array: True where an item was (probably) added before."""
+        items = list(items)
+        if not items:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(items)
+        bits = (self._bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+    def add_many(self, items):
+        items = list(items)
+        if not items:
+            return
+        positions = self._positions(items).ravel()
+        np.bitwise_or.at(self._bits, positions >> np.uint64(3),
+                         np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(items)
+
+    def __contains__(self, item):
+        return bool(self.contains_many([item])[0])
+
+    def add(self, item):
+        self.add_many([item])
+
+    def save(self, path):
+        """Write the filter to `path`, replacing any earlier file in one step."""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.array([self.size, self.hashes, self.count], dtype='<u8').tofile(f)
+            self._bits.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            size, hashes, count = (int(value) for value in np.fromfile(f, dtype='<u8', count=3))
+            bloom = cls(0, bits=size, hashes=hashes, count=count)
+            bloom._bits = np.fromfile(f, dtype=np.uint8)
+        return bloom
@@ -0,0 +1,132 @@
+# champion_data.py
+import json
+import os
+import threading
+import time
+
+from config.config import CACHE_DIR, DDRAGON_CHECK_INTERVAL, DDRAGON_RETRY_INTERVAL
+from data_module.http_client import ddragon_client
+from data_module.metrics import event, get_metrics
+
+DDRAGON_CACHE_DIR = os.path.join(CACHE_DIR, 'ddragon')
+LATEST_FILE = os.path.join(DDRAGON_CACHE_DIR, 'latest.json')
+
+
+class ChampionNameMap:
+    """Champion ID to name lookup backed by a dense list indexed by champion ID.
+
+    Behaves like the dict that get_champion_name_map used to return
+    (`get`, `[]`, `in`, `items`), but a lookup is a single list index.
+    """
+
+    def __init__(self, mapping, version=None):
+        self.version = version
+        self._names = [None] * (max(mapping, default=-1) + 1)
+        for champion_id, name in mapping.items():
+            self._names[champion_id] = name
+
+    def get(self, champion_id, default=None):
+        if 0 <= champion_id < len(self._names):
+            name = self._names[champion_id]
+            if name is not None:
+                return name
+        return default
+
+    def __getitem__(self, champion_id):
+        name = self.get(champion_id)
+        if name is None:
+            raise KeyError(champion_id)
+        return name
+
+    def __contains__(self, champion_id):
+        return self.get(champion_id) is not None
+
+    def __len__(self):
+        return sum(name is not None for name in self._names)
+
+    def items(self):
+        return ((champion_id, name) for champion_id, name in enumerate(self._names) if name is not None)
+
+
+def _champion_file(version):
+    return os.path.join(DDRAGON_CACHE_DIR, f'champions-{version}.json')
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, data):
+    # Write to a temp file first so readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _load_cached(version):
+    data = _read_json(_champion_file(version)) if version else None
+    if data is None:
+        return None
+    return ChampionNameMap({int(key): name for key, name in data.items()}, version)
+
+def _download(version):
+    champions = ddragon_client().get_json(f'/cdn/{version}/data/en_US/champion.json')
+    mapping = {int(champ['key']): champ['name'] for champ in champions['data'].values()}
+    _write_json(_champion_file(version), mapping)
+    return ChampionNameMap(mapping, version)
+
+def _shipped_map():
+    from data_set_handling.champion_mapping import champion_mapping
+    return ChampionNameMap(champion_mapping, version=None)
+
+
+_current = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+def get_champion_name_map():
+    """Get the champion ID to name map for the latest patch.
+
+    Data Dragon is asked for the latest version at most once every
+    DDRAGON_CHECK_INTERVAL seconds, and champion data is downloaded only
+    when the patch changes. If Data Dragon is unreachable the last cached
+    patch is used, then the mapping shipped in data_set_handling, and the
+    check is retried after DDRAGON_RETRY_INTERVAL seconds.
+    """
+    global _current, _checked_at
+    metrics = get_metrics()
+    with _lock:
+        now = time.time()
+        if _current is not None and now - _checked_at < DDRAGON_CHECK_INTERVAL:
+            metrics.inc('lana_cache_requests_total', cache='champion_map', result='hit')
+            return _current
+
+        latest = _read_json(LATEST_FILE) or {}
+        if now - latest.get('checked_at', 0) < DDRAGON_CHECK_INTERVAL:
+            cached = _load_cached(latest.get('version'))
+            if cached is not None:
+                metrics.inc('lana_cache_requests_total', cache='champion_map', result='disk')
+                _current, _checked_at = cached, latest['checked_at']
+                return _current
+
+        metrics.inc('lana_cache_requests_total', cache='champion_map', result='miss')
+
+        checked_at = now
+        try:
+            version = ddragon_client().get_json('/api/versions.json')[0]
+            champion_map = _load_cached(version) or _download(version)
+            _write_json(LATEST_FILE, {'version': version, 'checked_at': now})
+        except Exception as e:
+            # Count the fallback as checked only until the retry is due
+            checked_at = now - DDRAGON_CHECK_INTERVAL + DDRAGON_RETRY_INTERVAL
+            event('ddragon_error', f"Error fetching champion data: {e}", level='warning', error=str(e))
+            champion_map = _current or _load_cached(latest.get('version'))
+            if champion_map is None:
+                event('ddragon_fallback', "Using the bundled champion mapping.", level='warning')
+                champion_map = _shipped_map()
+
+        _current, _checked_at = champion_map, checked_at
+        return _current
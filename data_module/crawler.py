@@ -0,0 +1,230 @@
+# crawler.py
+import glob
+import json
+import os
+import re
+import uuid
+
+from config.config import (
+    CRAWL_BUDGET_SHARE, CRAWL_CAPACITY, CRAWL_DATASET_PATH, CRAWL_MATCHES_PER_PLAYER, CRAWL_STATE_PATH,
+)
+from data_module.batch_collecter import resolve_puuids
+from data_module.bloom_filter import BloomFilter
+from data_module.data_collecter import get_match_ids, iter_match_data
+from data_module.fetch_engine import get_fetch_engine, request_class
+from data_module.http_client import RiotAPIError
+from data_module.match_dataset import append_matches
+from data_module.match_records import all_participants
+from data_module.metrics import event, get_metrics
+
+SAVE_EVERY = 5000  # Rows buffered before a checkpoint
+
+
+def _participants_or_none(raw):
+    try:
+        return all_participants(raw)
+    except Exception as e:
+        event('match_error', f"Error processing match: {e}", level='error', error=str(e))
+        return None
+
+
+class Crawler:
+    """Breadth-first crawl of the participant graph into a match dataset.
+
+    Starting from seed players, each player in the frontier has their last
+    `matches_per_player` matches listed; every match not crawled before is
+    downloaded, all ten participants' rows are written to `dataset_path`,
+    and participants never seen before join the end of the frontier.
+
+    Everything needed to resume lives in `path`: the frontier is an
+    append-only file of PUUIDs read from a saved offset, and the matches
+    and players already seen are kept in Bloom filters, about 18 MB each
+    for the default capacity of ten million. A checkpoint every SAVE_EVERY
+    rows writes the rows, then the filters, then state.json, which
+    commits it. After an interruption the crawl resumes from the last
+    checkpoint. Each checkpoint's rows go into files named after the crawl
+    and the checkpoint's generation, and files from a checkpoint that never
+    committed are deleted on resume, so no row is written twice.
+
+    Requests run through the shared fetch engine as backfill, behind
+    interactive and live calls, with a budget of `budget_share` of the
+    key's rate limits.
+    """
+
+    def __init__(self, path=CRAWL_STATE_PATH, dataset_path=CRAWL_DATASET_PATH, region='americas',
+                 matches_per_player=CRAWL_MATCHES_PER_PLAYER, budget_share=CRAWL_BUDGET_SHARE,
+                 capacity=CRAWL_CAPACITY, concurrency=None):
+        self.path = path
+        self.dataset_path = dataset_path
+        self.region = region
+        self.matches_per_player = matches_per_player
+        self.concurrency = concurrency
+        self._budget = get_fetch_engine().budget(budget_share)
+        os.makedirs(path, exist_ok=True)
+
+        self.state = self._read_state()
+        if self.state is None or 'crawl_id' not in self.state:
+            self.state = self.state or {
+                'generation': 0, 'head': 0, 'tail': 0,
+                'players_queued': 0, 'players_crawled': 0, 'matches': 0, 'rows': 0,
+            }
+            self.state['crawl_id'] = uuid.uuid4().hex  # Names this crawl's files in a shared dataset
+            self._write_state()
+        self._discard_uncommitted_rows()
+        self.seen_matches = self._load_filter('matches', capacity)
+        self.seen_players = self._load_filter('players', capacity)
+
+        # Frontier lines appended after the last checkpoint were never committed
+        frontier_path = os.path.join(path, 'frontier.txt')
+        with open(frontier_path, 'ab') as f:
+            f.truncate(self.state['tail'])
+        self._frontier = open(frontier_path, 'ab')
+        self._reader = open(frontier_path, 'rb')
+        self._reader.seek(self.state['head'])
+        self._head = self.state['head']
+        self._rows = []
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _write_state(self):
+        tmp_path = self._file('state.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self._file('state.json'))
+
+    def _read_state(self):
+        try:
+            with open(self._file('state.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _discard_uncommitted_rows(self):
+        # Rows written by a checkpoint that crashed before committing are written again
+        pattern = re.compile(rf"crawl-{self.state['crawl_id']}-(\d+)-\d+\.parquet$")
+        for path in glob.glob(os.path.join(self.dataset_path, '**', f"crawl-{self.state['crawl_id']}-*.parquet"),
+                              recursive=True):
+            match = pattern.search(os.path.basename(path))
+            if match and int(match.group(1)) > self.state['generation']:
+                os.remove(path)
+
+    def _load_filter(self, name, capacity):
+        filter_path = self._file(f"{name}-{self.state['generation']}.bloom")
+        if os.path.exists(filter_path):
+            return BloomFilter.load(filter_path)
+        return BloomFilter(capacity)
+
+    @property
+    def frontier_size(self):
+        """Players queued but not crawled yet."""
+        return self.state['players_queued'] - self.state['players_crawled']
+
+    def _enqueue(self, puuids):
+        puuids = list(dict.fromkeys(puuids))
+        new = [puuid for puuid, seen in zip(puuids, self.seen_players.contains_many(puuids)) if not seen]
+        self.seen_players.add_many(new)
+        self._frontier.write(''.join(f'{puuid}\n' for puuid in new).encode())
+        self.state['players_queued'] += len(new)
+        return len(new)
+
+    def seed(self, riot_ids):
+        """Queue the players behind some Riot IDs; players crawled or queued before are skipped."""
+        with request_class('backfill', tenant='crawler'):
+            added = self._enqueue(resolve_puuids(riot_ids).values())
+        self.checkpoint()
+        return added
+
+    def _next_player(self):
+        line = self._reader.readline()
+        if not line.endswith(b'\n'):
+            self._frontier.flush()  # Players found since the last flush may still be buffered
+            line += self._reader.readline()
+        return line.decode().strip() or None
+
+    def _crawl_player(self, puuid):
+        try:
+            match_ids = list(dict.fromkeys(get_match_ids(
+                self.region, puuid, count=self.matches_per_player, budget=self._budget
+            )))
+        except RiotAPIError as err:
+            event('crawl_error', f"Failed to list matches for {puuid}: {err}", level='warning',
+                  puuid=puuid, error=str(err))
+            return 0
+        new_ids = [match_id for match_id, seen in zip(match_ids, self.seen_matches.contains_many(match_ids))
+                   if not seen]
+
+        # Nothing is kept until the player is done, so an interrupted player is crawled again in full
+        crawled = []
+        rows = []
+        for records in iter_match_data(self.region, new_ids, self.concurrency, _participants_or_none,
+                                       keep=False, budget=self._budget):
+            if records:
+                crawled.append(records[0].matchId)
+                rows.extend(records)
+        self.seen_matches.add_many(crawled)
+        self._enqueue(row.puuid for row in rows)
+        self._rows.extend(rows)
+        return len(crawled)
+
+    def checkpoint(self):
+        """Write buffered rows and commit the crawl's progress."""
+        old_generation = self.state['generation']
+        generation = old_generation + 1
+        rows = 0
+        if self._rows:
+            rows = append_matches(self._rows, self.dataset_path, by_player=False,
+                                  basename=f"crawl-{self.state['crawl_id']}-{generation:08d}")
+        self._rows = []
+        self._frontier.flush()
+        os.fsync(self._frontier.fileno())
+
+        self.seen_matches.save(self._file(f'matches-{generation}.bloom'))
+        self.seen_players.save(self._file(f'players-{generation}.bloom'))
+        self.state.update(generation=generation, head=self._head, tail=self._frontier.tell(),
+                          rows=self.state['rows'] + rows)
+        self._write_state()
+        for name in ('matches', 'players'):
+            try:
+                os.remove(self._file(f'{name}-{old_generation}.bloom'))
+            except FileNotFoundError:
+                pass
+
+    def run(self, max_matches=None, max_players=None):
+        """Crawl until the frontier is empty or a limit is reached; returns the crawl totals.
+
+        Interrupting the crawl (Ctrl+C) still checkpoints everything fully
+        crawled so far.
+        """
+        metrics = get_metrics()
+        matches = players = 0
+        try:
+            with request_class('backfill', tenant='crawler'):
+                while ((max_matches is None or matches < max_matches)
+                       and (max_players is None or players < max_players)):
+                    puuid = self._next_player()
+                    if puuid is None:
+                        event('crawl_exhausted', "The crawl frontier is empty.")
+                        break
+                    added = self._crawl_player(puuid)
+                    self._head = self._reader.tell()  # Only players crawled to the end count as done
+                    matches += added
+                    players += 1
+                    self.state['matches'] += added
+                    self.state['players_crawled'] += 1
+                    metrics.inc('lana_crawl_matches_total', added)
+                    metrics.inc('lana_crawl_players_total')
+                    if len(self._rows) >= SAVE_EVERY:
+                        self.checkpoint()
+                        event('crawl_progress',
+                              f"Crawled {self.state['players_crawled']} players and {self.state['matches']} matches; "
+                              f"{self.frontier_size} players queued.",
+                              players=self.state['players_crawled'], matches=self.state['matches'],
+                              frontier=self.frontier_size)
+        finally:
+            self.checkpoint()
+        return dict(self.state, frontier=self.frontier_size)
+
+    def close(self):
+        self._frontier.close()
+        self._reader.close()
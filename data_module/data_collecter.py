@@ -1,317 +1,596 @@
-import requests
-import concurrent.futures
-from riotwatcher import LolWatcher, ApiError
+import functools
+import time
 from collections import defaultdict
-from config.config import API_KEY
+from data_module.match_store import get_match_store
+from data_module.fetch_engine import DeadlineExceeded, get_fetch_engine, is_transient, request_class
+from data_module.http_client import RiotAPIError, riot_get, riot_get_bytes
+from data_module.match_records import extract_participant, parse_match
+from data_module.champion_data import get_champion_name_map
+from data_module.lookup_cache import NOT_FOUND, STALE, get_lookup_cache
+from data_module.metrics import endpoint_name, event, get_metrics, stage
+from config.config import LOOKUP_NEGATIVE_TTL, LOOKUP_STALE_FACTOR, LOOKUP_TTLS, SYNC_OVERLAP
 
-watcher = LolWatcher(API_KEY)
+MATCH_IDS_PAGE_SIZE = 100  # Most match IDs the API returns per call
+
+def riot_request(region, path, params=None, budget=None):
+    """Call a Riot API path under the shared rate limits, using the pooled client.
+
+    Concurrent requests for the same path and parameters share one API call
+    and get the same parsed response, so callers must not modify it.
+    """
+    key = (endpoint_name(path), region, path, tuple(sorted((params or {}).items())))
+    return get_fetch_engine().call(region, riot_get, path, params, key=key, budget=budget)
+
+def _cache_answer(region, path, key):
+    """Call the API for a cacheable lookup and cache its answer, remembering 404s too."""
+    name = key[0]
+    cache = get_lookup_cache()
+    try:
+        value = riot_get(region, path)
+    except RiotAPIError as err:
+        if err.kind == 'not_found':
+            cache.put(key, NOT_FOUND, LOOKUP_NEGATIVE_TTL)
+        raise
+    ttl = LOOKUP_TTLS.get(name, 0.0)
+    cache.put(key, value, ttl, ttl * LOOKUP_STALE_FACTOR)
+    return value
+
+def cached_request(region, path):
+    """riot_request for lookups that rarely change, served from the lookup cache when possible.
+
+    Fresh answers, remembered 404s included, cost no API call. An expired
+    answer is still served for a while (LOOKUP_STALE_FACTOR) and refreshed
+    in the background meanwhile. TTLs per endpoint come from LOOKUP_TTLS.
+    """
+    name = endpoint_name(path)
+    key = (name, region, path, ())
+    state, value = get_lookup_cache().get(key)
+    metrics = get_metrics()
+    if state is None:
+        metrics.inc('lana_cache_requests_total', cache='lookup', endpoint=name, result='miss')
+        # Same key as riot_request, so a miss joins a refresh already in flight
+        return get_fetch_engine().call(region, _cache_answer, path, key, key=key)
+    if state == STALE:
+        get_fetch_engine().submit(region, _cache_answer, path, key, key=key)
+    metrics.inc('lana_cache_requests_total', cache='lookup', endpoint=name,
+                result='negative' if value is NOT_FOUND else state)
+    if value is NOT_FOUND:
+        raise RiotAPIError('not_found', f"404 Not Found (cached) for {path}")
+    return value
+
+def _lookup_failed(err, lookup, not_found_message, not_found_level='warning'):
+    """Report a failed lookup as an event, with the message the console has always shown."""
+    if err.kind == 'not_found':
+        event('not_found', not_found_message, level=not_found_level, lookup=lookup)
+    elif err.kind == 'unauthorized':
+        event('unauthorized', "Unauthorized - check your API key.", level='error', lookup=lookup)
+    elif err.kind == 'network':
+        event('request_error', f"Request error: {err}", level='error', lookup=lookup)
+    else:
+        event('http_error', f"HTTP error occurred: {err}", level='error', lookup=lookup, status=err.status_code)
 
 def get_summoner_puuid_by_riot_id(game_name, tag_line, region='americas'):
     """Get PUUID using Riot ID (game name and tag line)."""
-    url = f"https://{region}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-    headers = {"X-Riot-Token": API_KEY}
+    path = f"/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
     
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()['puuid']
-    except requests.exceptions.HTTPError as err:
-        if response.status_code == 404:
-            print("Riot ID not found.")
-        elif response.status_code == 401:
-            print("Unauthorized - check your API key.")
-        else:
-            print(f"HTTP error occurred: {err}")
-    except requests.exceptions.RequestException as err:
-        print(f"Request error: {err}")
+        return cached_request(region, path)['puuid']
+    except RiotAPIError as err:
+        _lookup_failed(err, 'account', "Riot ID not found.")
     return None
 
 def get_summoner_id_by_puuid(puuid, region='na1'):
     """Get summoner ID using PUUID."""
-    url = f"https://{region}.api.riotgames.com/lol/summoner/v4/summoners/by-puuid/{puuid}"
-    headers = {"X-Riot-Token": API_KEY}
+    path = f"/lol/summoner/v4/summoners/by-puuid/{puuid}"
     
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()['id']
-    except requests.exceptions.HTTPError as err:
-        if response.status_code == 404:
-            print("PUUID not found.")
-        elif response.status_code == 401:
-            print("Unauthorized - check your API key.")
-        else:
-            print(f"HTTP error occurred: {err}")
-    except requests.exceptions.RequestException as err:
-        print(f"Request error: {err}")
+        return cached_request(region, path)['id']
+    except RiotAPIError as err:
+        _lookup_failed(err, 'summoner', "PUUID not found.")
     return None
 
 def get_live_game_data(summoner_id, region='na1'):
     """Get current game information for a summoner."""
-    url = f"https://{region}.api.riotgames.com/lol/spectator/v4/active-games/by-summoner/{summoner_id}"
-    headers = {"X-Riot-Token": API_KEY}
+    path = f"/lol/spectator/v4/active-games/by-summoner/{summoner_id}"
     
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as err:
-        if response.status_code == 404:
-            print("Summoner is not currently in a game.")
-        elif response.status_code == 401:
-            print("Unauthorized - check your API key.")
-        else:
-            print(f"HTTP error occurred: {err}")
-    except requests.exceptions.RequestException as err:
-        print(f"Request error: {err}")
+        return cached_request(region, path)
+    except RiotAPIError as err:
+        _lookup_failed(err, 'spectator', "Summoner is not currently in a game.", not_found_level='info')
     return None
 
-def get_champion_name_map():
-    """Get a mapping of champion IDs to champion names using Data Dragon."""
+def get_match_ids(region, puuid, count=20, start=0, start_time=None, end_time=None, budget=None):
+    """Get match IDs for a player, newest first.
+
+    Pages past the API's 100-IDs-per-call limit. start_time/end_time are
+    epoch seconds; count=None returns every match in that range.
+    """
+    path = f"/lol/match/v5/matches/by-puuid/{puuid}/ids"
+    match_ids = []
+    while count is None or len(match_ids) < count:
+        page_size = MATCH_IDS_PAGE_SIZE if count is None else min(MATCH_IDS_PAGE_SIZE, count - len(match_ids))
+        params = {'start': start + len(match_ids), 'count': page_size}
+        if start_time is not None:
+            params['startTime'] = int(start_time)
+        if end_time is not None:
+            params['endTime'] = int(end_time)
+        page = riot_request(region, path, params, budget)
+        match_ids.extend(page)
+        if len(page) < page_size:  # Reached the end of the history
+            break
+    return match_ids
+
+def _match_key(match_id):
+    # Match IDs carry their platform, so the ID alone identifies a download
+    return ('match.by_id', match_id)
+
+def _download_match(region, match_id):
+    """Download a match from the API and keep it in the match store, as received."""
+    raw = riot_get_bytes(region, f"/lol/match/v5/matches/{match_id}")
+    get_match_store().put_raw(match_id, raw)
+    return raw
+
+def _download_match_unstored(region, match_id):
+    return riot_get_bytes(region, f"/lol/match/v5/matches/{match_id}")
+
+def fetch_match(region, match_id):
+    """Get match data, checking the local match store before calling the API."""
+    match_data = get_match_store().get(match_id)
+    get_metrics().inc('lana_cache_requests_total', cache='match_store', result='miss' if match_data is None else 'hit')
+    if match_data is None:
+        raw = get_fetch_engine().call(region, _download_match, match_id, key=_match_key(match_id))
+        match_data = parse_match(raw)
+    return match_data
+
+def iter_match_data(region, match_ids, concurrency=None, extract=None, keep=True, budget=None, failures=None):
+    """Yield match data for each match ID as it becomes available.
+
+    Stored matches are served first without touching the API. The rest are
+    downloaded through the shared fetch engine; stopping the iteration early
+    cancels the downloads that haven't finished. A match another caller is
+    already downloading is waited for rather than downloaded again. With
+    `extract`, each raw payload is passed through extract() right away (in
+    a download worker) and only its result is yielded. With keep=False new
+    downloads aren't added to the match store, for bulk jobs whose payloads
+    would only fill the disk. `budget` is passed on to the fetch engine.
+    Matches that fail are logged and skipped; with a `failures` dict, each
+    is also recorded there as match_id: exception.
+    """
+    extract = extract or parse_match
+    store = get_match_store()
+    missing = []
+    for match_id in match_ids:
+        raw = store.get_raw(match_id)
+        if raw is None:
+            missing.append(match_id)
+        else:
+            yield extract(raw)
+    metrics = get_metrics()
+    metrics.inc('lana_cache_requests_total', len(match_ids) - len(missing), cache='match_store', result='hit')
+    metrics.inc('lana_cache_requests_total', len(missing), cache='match_store', result='miss')
+
+    download = _download_match if keep else _download_match_unstored
+    downloads = get_fetch_engine().map(region, download, missing, concurrency,
+                                       key=_match_key, transform=extract, budget=budget)
     try:
-        versions = requests.get('https://ddragon.leagueoflegends.com/api/versions.json').json()
-        latest = versions[0]
-        champions = requests.get(f'https://ddragon.leagueoflegends.com/cdn/{latest}/data/en_US/champion.json').json()
-        
-        champion_map = {}
-        for champ_name, champ_data in champions['data'].items():
-            champion_map[int(champ_data['key'])] = champ_name
-            
-        return champion_map
-    except Exception as e:
-        print(f"Error fetching champion data: {e}")
-        return {}
+        for match_id, future in downloads:
+            try:
+                yield future.result()
+            except DeadlineExceeded:
+                raise  # The whole call is out of time, not just this match
+            except Exception as e:
+                event('match_error', f"Error processing match {match_id}: {e}", level='error',
+                      match_id=match_id, error=str(e))
+                if failures is not None:
+                    failures[match_id] = e
+    finally:
+        downloads.close()
 
-def get_champion_specific_matches(region, puuid, champion_id, count=5):
+def _download_timeline(region, match_id):
+    """Download a match timeline and reduce it to per-minute arrays in the worker."""
+    from data_module.timeline_store import parse_timeline
+
+    return parse_timeline(riot_get_bytes(region, f"/lol/match/v5/matches/{match_id}/timeline"))
+
+def ingest_timelines(region, match_ids, concurrency=None):
+    """Download the timelines of matches not yet in the timeline store.
+
+    Only the compact per-minute arrays are kept; the raw timeline payload is
+    dropped in the download worker. Returns how many timelines were added.
+    """
+    from data_module.timeline_store import get_timeline_store
+
+    store = get_timeline_store()
+    wanted = list(dict.fromkeys(match_ids))
+    missing = [match_id for match_id in wanted if match_id not in store]
+    metrics = get_metrics()
+    metrics.inc('lana_cache_requests_total', len(wanted) - len(missing), cache='timeline_store', result='hit')
+    metrics.inc('lana_cache_requests_total', len(missing), cache='timeline_store', result='miss')
+    downloads = get_fetch_engine().map(region, _download_timeline, missing, concurrency)
+    added = 0
+    try:
+        for match_id, future in downloads:
+            try:
+                store.put(match_id, *future.result())
+                added += 1
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                event('timeline_error', f"Error processing timeline {match_id}: {e}", level='error',
+                      match_id=match_id, error=str(e))
+    finally:
+        downloads.close()
+        store.flush()
+    return added
+
+def _champion_rows(region, puuid, quotas, concurrency=None):
+    """Rows for the requested champions ({championId: games}) from the last 100 matches."""
+    matches = get_match_ids(region, puuid, count=100)  # Get more matches to filter
+    return _match_rows(region, puuid, matches, concurrency, quotas)
+
+def _champion_totals(rows, champion_ids=None):
+    """Per-champion win/game/kill/death/assist totals, as returned by the champion functions."""
+    from data_module.analytics import summarize_rows
+
+    summary = summarize_rows(rows, groups=champion_ids)
+    totals = summary[['wins', 'games', 'kills', 'deaths', 'assists']].astype(int)
+    return {int(champion_id): stats for champion_id, stats in totals.to_dict('index').items()}
+
+def get_champion_specific_matches(region, puuid, champion_id, count=5, concurrency=None):
     """Get and analyze matches for a specific champion."""
     try:
-        matches = watcher.match.matchlist_by_puuid(region, puuid, count=100)  # Get more matches to filter
-        champion_stats = {'wins': 0, 'games': 0, 'kills': 0, 'deaths': 0, 'assists': 0}
-        matches_analyzed = 0
-        
-        # Use ThreadPoolExecutor for parallel match data retrieval
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_match = {
-                executor.submit(watcher.match.by_id, region, match_id): match_id 
-                for match_id in matches
-            }
-            
-            for future in concurrent.futures.as_completed(future_to_match):
-                if matches_analyzed >= count:  # Stop after analyzing desired number of matches
-                    break
-                    
-                try:
-                    match_data = future.result()
-                    for participant in match_data['info']['participants']:
-                        if participant['puuid'] == puuid and participant['championId'] == champion_id:
-                            champion_stats['games'] += 1
-                            champion_stats['wins'] += 1 if participant['win'] else 0
-                            champion_stats['kills'] += participant['kills']
-                            champion_stats['deaths'] += participant['deaths']
-                            champion_stats['assists'] += participant['assists']
-                            matches_analyzed += 1
-                            break
-                except Exception as e:
-                    print(f"Error processing match: {e}")
-                    continue
-                    
-        return champion_stats
-    except ApiError as err:
-        print(f"Failed to retrieve matches: {err}")
+        rows = _champion_rows(region, puuid, {champion_id: count}, concurrency)
+        return _champion_totals(rows, [champion_id])[champion_id]
+    except RiotAPIError as err:
+        event('match_list_error', f"Failed to retrieve matches: {err}", level='error', puuid=puuid, error=str(err))
         return None
 
 def get_champion_mastery(puuid, region='na1'):
     """Get top 5 champion mastery entries for a summoner using PUUID."""
-    url = f"https://{region}.api.riotgames.com/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}"
-    headers = {"X-Riot-Token": API_KEY}
+    path = f"/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}"
     
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 403:
-            print("Error: Champion mastery endpoint access is forbidden. Please check if your API key has the required permissions.")
-            print("You may need to:\n1. Generate a new API key\n2. Ensure 'CHAMPION-MASTERY-V4' is enabled in your API key settings")
-            return None
-        response.raise_for_status()
-        return response.json()[:5]  # Get top 5 champions
-    except requests.exceptions.HTTPError as err:
-        if response.status_code == 404:
-            print(f"No mastery data found for PUUID: {puuid}")
-        elif response.status_code == 401:
-            print("Unauthorized - check your API key.")
+        return cached_request(region, path)[:5]  # Get top 5 champions
+    except RiotAPIError as err:
+        if err.kind == 'forbidden':
+            event('forbidden', "Error: Champion mastery endpoint access is forbidden. Please check if your API key has the required permissions.\n"
+                  "You may need to:\n1. Generate a new API key\n2. Ensure 'CHAMPION-MASTERY-V4' is enabled in your API key settings",
+                  level='error', lookup='mastery')
+        elif err.kind == 'not_found':
+            event('not_found', f"No mastery data found for PUUID: {puuid}", level='warning', lookup='mastery', puuid=puuid)
+        elif err.kind == 'unauthorized':
+            event('unauthorized', "Unauthorized - check your API key.", level='error', lookup='mastery')
+        elif err.kind == 'network':
+            event('request_error', f"Request error while fetching mastery data: {err}", level='error', lookup='mastery')
         else:
-            print(f"HTTP error occurred while fetching mastery data: {err}")
-    except requests.exceptions.RequestException as err:
-        print(f"Request error while fetching mastery data: {err}")
+            event('http_error', f"HTTP error occurred while fetching mastery data: {err}", level='error',
+                  lookup='mastery', status=err.status_code)
     return None
 
-def get_champion_specific_matches_batch(region, puuid, count=100):
-    """Get match history and process all champions at once."""
+def get_champion_specific_matches_batch(region, puuid, count=100, concurrency=None):
+    """Get match history and process all champions at once.
+
+    Requests run as backfill, behind interactive lookups.
+    """
     try:
-        # Get matches in one batch
-        matches = watcher.match.matchlist_by_puuid(region, puuid, count=count)
-        champion_stats = defaultdict(lambda: {'wins': 0, 'games': 0, 'kills': 0, 'deaths': 0, 'assists': 0})
+        with request_class('backfill'):
+            # Get matches in one batch
+            matches = get_match_ids(region, puuid, count=count)
+            rows = _match_rows(region, puuid, matches, concurrency)
         
-        # Use ThreadPoolExecutor for parallel match data retrieval
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_match = {
-                executor.submit(watcher.match.by_id, region, match_id): match_id 
-                for match_id in matches
-            }
-            
-            for future in concurrent.futures.as_completed(future_to_match):
-                try:
-                    match_data = future.result()
-                    for participant in match_data['info']['participants']:
-                        if participant['puuid'] == puuid:
-                            champion_id = participant['championId']
-                            stats = champion_stats[champion_id]
-                            stats['games'] += 1
-                            stats['wins'] += 1 if participant['win'] else 0
-                            stats['kills'] += participant['kills']
-                            stats['deaths'] += participant['deaths']
-                            stats['assists'] += participant['assists']
-                            break
-                except Exception as e:
-                    print(f"Error processing match: {e}")
-                    continue
-                    
+        champion_stats = defaultdict(lambda: {'wins': 0, 'games': 0, 'kills': 0, 'deaths': 0, 'assists': 0})
+        champion_stats.update(_champion_totals(rows))
         return champion_stats
-    except ApiError as err:
-        print(f"Failed to retrieve matches: {err}")
+    except RiotAPIError as err:
+        event('match_list_error', f"Failed to retrieve matches: {err}", level='error', puuid=puuid, error=str(err))
+        return None
+
+def get_champion_specific_matches_multi(region, puuid, champion_ids, count=10, concurrency=None):
+    """Get stats for several champions from a single pass over the match history.
+
+    The match list is fetched once and every match is checked against all
+    requested champions. Once each champion has `count` games the remaining
+    downloads are cancelled.
+    """
+    try:
+        rows = _champion_rows(region, puuid, {champion_id: count for champion_id in champion_ids}, concurrency)
+        return _champion_totals(rows, list(champion_ids))
+    except RiotAPIError as err:
+        event('match_list_error', f"Failed to retrieve matches: {err}", level='error', puuid=puuid, error=str(err))
         return None
 
-def get_champion_stats(game_name, tag_line, region='na1'):
-    """Get champion mastery and win rates with optimized data retrieval."""
-    print("Retrieving summoner information...")
-    puuid = get_summoner_puuid_by_riot_id(game_name, tag_line)
+def get_champion_stats(game_name, tag_line, region='na1', single_pass=False, from_rollups=False):
+    """Get champion mastery and win rates with optimized data retrieval.
+
+    By default each champion's stats come from its last 10 games in the
+    last 100 matches. With from_rollups=True they come from the stored
+    champion rollups instead, covering every game synced for the player,
+    after an incremental sync fetches whatever is new.
+    """
+    event('account_lookup', "Retrieving summoner information...", game_name=game_name, tag_line=tag_line)
+    with stage('account_lookup'):
+        puuid = get_summoner_puuid_by_riot_id(game_name, tag_line)
     if not puuid:
-        print("Error: Could not retrieve PUUID. Champion stats unavailable.")
+        event('champion_stats_unavailable', "Error: Could not retrieve PUUID. Champion stats unavailable.",
+              level='error', reason='puuid')
         return None
         
     # Get champion mastery data
-    print("Retrieving champion mastery data...")
-    mastery_data = get_champion_mastery(puuid, region)
+    event('mastery_lookup', "Retrieving champion mastery data...", puuid=puuid)
+    with stage('mastery'):
+        mastery_data = get_champion_mastery(puuid, region)
     if not mastery_data:
-        print("Could not retrieve champion mastery data. Please check your API key permissions.")
+        event('champion_stats_unavailable',
+              "Could not retrieve champion mastery data. Please check your API key permissions.",
+              level='error', reason='mastery')
         return None
     
     # Get champion name mapping
-    champion_map = get_champion_name_map()
+    with stage('champion_map'):
+        champion_map = get_champion_name_map()
     champion_stats = []
     
-    print("Analyzing match history for each champion...")
-    # Process each champion's matches individually
+    champion_ids = [champion['championId'] for champion in mastery_data]
+    rows = []
+    summary = None
+    analyzed = set()
+    
+    with stage('match_fanout'):
+        if from_rollups:
+            # Bring the rollups up to date with any new games, then read one row per champion
+            event('champion_analysis', "Updating match history and reading champion rollups...",
+                  champion_ids=champion_ids)
+            if sync_match_history('americas', puuid, count=100) is not None:
+                from data_module.analytics import summarize_totals
+
+                summary = summarize_totals(get_match_store().rollup_totals(puuid, champion_ids=champion_ids),
+                                           champion_ids)
+                analyzed.update(champion_ids)
+        elif single_pass:
+            # One match list and one stream of downloads shared by every champion
+            event('champion_analysis', "Analyzing match history for all champions in one pass...",
+                  champion_ids=champion_ids)
+            try:
+                rows = _champion_rows('americas', puuid, {champion_id: 10 for champion_id in champion_ids})
+                analyzed.update(champion_ids)
+            except RiotAPIError as err:
+                event('match_list_error', f"Failed to retrieve matches: {err}", level='error',
+                      puuid=puuid, error=str(err))
+        else:
+            event('champion_analysis', "Analyzing match history for each champion...", champion_ids=champion_ids)
+            # Process each champion's matches individually
+            for champion_id in champion_ids:
+                event('champion_analysis',
+                      f"Analyzing matches for {champion_map.get(champion_id, f'Champion {champion_id}')}...",
+                      champion_id=champion_id)
+                try:
+                    # Get 10 matches for this specific champion
+                    rows.extend(_champion_rows('americas', puuid, {champion_id: 10}))
+                    analyzed.add(champion_id)
+                except RiotAPIError as err:
+                    event('match_list_error', f"Failed to retrieve matches: {err}", level='error',
+                          puuid=puuid, champion_id=champion_id, error=str(err))
+    
+    if summary is None:
+        # Win rate, KDA and per-game averages for every champion in one grouped pass
+        from data_module.analytics import summarize_rows
+
+        summary = summarize_rows(rows, groups=champion_ids)
+    
     for champion in mastery_data:
         champion_id = champion['championId']
-        print(f"Analyzing matches for {champion_map.get(champion_id, f'Champion {champion_id}')}...")
-        
-        # Get 10 matches for this specific champion
-        match_stats = get_champion_specific_matches('americas', puuid, champion_id, count=10)
+        if champion_id not in analyzed:
+            continue
+        match_stats = summary.loc[champion_id]
         
-        if match_stats:
-            win_rate = (match_stats['wins'] / match_stats['games'] * 100) if match_stats['games'] > 0 else 0
-            kda = (match_stats['kills'] + match_stats['assists']) / max(1, match_stats['deaths']) if match_stats['games'] > 0 else 0
-            
-            champion_stats.append({
-                'championId': champion_id,
-                'championName': champion_map.get(champion_id, f"Champion {champion_id}"),
-                'championLevel': champion['championLevel'],
-                'championPoints': champion['championPoints'],
-                'win_rate': win_rate,
-                'games_analyzed': match_stats['games'],
-                'kda': kda,
-                'recent_performance': {
-                    'kills_per_game': match_stats['kills'] / match_stats['games'] if match_stats['games'] > 0 else 0,
-                    'deaths_per_game': match_stats['deaths'] / match_stats['games'] if match_stats['games'] > 0 else 0,
-                    'assists_per_game': match_stats['assists'] / match_stats['games'] if match_stats['games'] > 0 else 0
-                }
-            })
+        champion_stats.append({
+            'championId': champion_id,
+            'championName': champion_map.get(champion_id, f"Champion {champion_id}"),
+            'championLevel': champion['championLevel'],
+            'championPoints': champion['championPoints'],
+            'win_rate': float(match_stats['win_rate']),
+            'games_analyzed': int(match_stats['games']),
+            'kda': float(match_stats['kda']),
+            'recent_performance': {
+                'kills_per_game': float(match_stats['kills_per_game']),
+                'deaths_per_game': float(match_stats['deaths_per_game']),
+                'assists_per_game': float(match_stats['assists_per_game'])
+            }
+        })
     
     if not champion_stats:
-        print("No champion statistics could be calculated.")
+        event('champion_stats_unavailable', "No champion statistics could be calculated.",
+              level='warning', reason='no_games')
         return None
     
     # Sort by win rate in descending order
     champion_stats.sort(key=lambda x: x['win_rate'], reverse=True)
     return champion_stats
 
-def get_match_history(region, puuid, count=10):
-    """Get recent match history for a player."""
+def _extract_or_none(raw, puuid):
     try:
-        matches = watcher.match.matchlist_by_puuid(region, puuid, count=count)
-        match_details = []
-        
-        # Use ThreadPoolExecutor for parallel match data retrieval
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_match = {
-                executor.submit(watcher.match.by_id, region, match_id): match_id 
-                for match_id in matches
-            }
+        return extract_participant(raw, puuid)
+    except Exception as e:
+        event('match_error', f"Error processing match: {e}", level='error', puuid=puuid, error=str(e))
+        return None
+
+def _match_rows(region, puuid, match_ids, concurrency=None, quotas=None, failures=None):
+    """Fetch matches and return the player's ParticipantRecord for each match.
+
+    With `quotas` ({championId: games}) only games on those champions are
+    kept, and the remaining downloads are cancelled once every champion has
+    its quota. Every record fetched is also counted into the player's
+    champion rollups in the match store. `failures` is passed on to
+    iter_match_data.
+    """
+    match_details = []
+    seen = []
+    remaining = dict(quotas) if quotas is not None else None
+    
+    # Matches are fetched in parallel by the shared fetch engine, and each
+    # payload is reduced to the player's record as soon as it arrives
+    extract = functools.partial(_extract_or_none, puuid=puuid)
+    match_stream = iter_match_data(region, match_ids, concurrency, extract, failures=failures)
+    try:
+        for row in match_stream:
+            if row is None:
+                continue
+            seen.append(row)
             
-            for future in concurrent.futures.as_completed(future_to_match):
-                try:
-                    match_data = future.result()
-                    for participant in match_data['info']['participants']:
-                        if participant['puuid'] == puuid:
-                            match_details.append({
-                                'win': participant['win'],
-                                'duration': match_data['info']['gameDuration'],
-                                'kills': participant['kills'],
-                                'deaths': participant['deaths'],
-                                'assists': participant['assists'],
-                                'championId': participant['championId'],
-                                'role': participant.get('teamPosition', 'Unknown'),
-                                'vision_score': participant.get('visionScore', 0)
-                            })
-                            break
-                except Exception as e:
-                    print(f"Error processing match: {e}")
+            if remaining is not None:
+                if remaining.get(row.championId, 0) <= 0:
                     continue
-                    
-        return match_details
-    except ApiError as err:
-        print(f"Failed to retrieve match history: {err}")
+                remaining[row.championId] -= 1
+            match_details.append(row)
+            
+            if remaining is not None and not any(remaining.values()):  # Every champion has its quota
+                break
+    finally:
+        match_stream.close()  # Cancel downloads we no longer need
+        get_match_store().add_to_rollups(seen)  # Every game seen counts, not just the quota's
+            
+    return match_details
+
+def get_match_history(region, puuid, count=10, concurrency=None):
+    """Get recent match history for a player."""
+    try:
+        matches = get_match_ids(region, puuid, count=count)
+        return _match_rows(region, puuid, matches, concurrency)
+    except RiotAPIError as err:
+        event('match_history_error', f"Failed to retrieve match history: {err}", level='error',
+              operation='history', puuid=puuid, error=str(err))
+        return None
+
+def sync_match_history(region, puuid, count=10, concurrency=None):
+    """Get the matches a player has played since their last sync.
+
+    The first sync takes the latest `count` matches. Later syncs list only
+    match IDs from shortly before the previous sync (usually one list call),
+    and only matches missing from the match store are downloaded. If a
+    download fails in a way that may pass (a 429, a 5xx or a network
+    error), the sync time isn't moved on, so the next sync lists those
+    matches again. Matches that fail for good, like a 404, are skipped.
+    """
+    store = get_match_store()
+    state = store.get_sync_state(puuid)
+    synced_at = time.time()
+    try:
+        if state is None or state['last_synced'] is None:
+            matches = get_match_ids(region, puuid, count=count)
+        else:
+            matches = get_match_ids(region, puuid, count=None, start_time=state['last_synced'] - SYNC_OVERLAP)
+        failures = {}
+        match_details = _match_rows(region, puuid, matches, concurrency, failures=failures)
+    except RiotAPIError as err:
+        event('match_history_error', f"Failed to sync match history: {err}", level='error',
+              operation='sync', puuid=puuid, error=str(err))
         return None
+    
+    fields = {'last_synced': synced_at}
+    retry = [match_id for match_id, err in failures.items() if is_transient(err)]
+    if retry:
+        # A match ID doesn't say when the game was played, so keep the old sync time to list them again
+        del fields['last_synced']
+        event('match_history_incomplete', f"{len(retry)} matches failed to download; they will be retried.",
+              level='warning', operation='sync', puuid=puuid, failed=len(retry))
+    if len(failures) > len(retry):
+        event('match_history_skipped', f"{len(failures) - len(retry)} matches could not be fetched and were skipped.",
+              level='warning', operation='sync', puuid=puuid, skipped=len(failures) - len(retry))
+    if match_details and (state is None or state['oldest_time'] is None):
+        # Backfill continues just before the oldest game seen so far
+        fields['oldest_time'] = min(row.gameCreation for row in match_details) // 1000 - 1
+    if fields:
+        store.update_sync_state(puuid, **fields)
+    return match_details
+
+def backfill_match_history(region, puuid, chunk_size=100, max_chunks=1, concurrency=None):
+    """Walk a player's history backwards from the oldest match synced so far.
+
+    Fetches at most `max_chunks` chunks of `chunk_size` matches per call and
+    remembers where it stopped, so a full-history backfill can be spread
+    over many calls. Returns the rows fetched in this call. Requests run as
+    backfill, behind interactive lookups.
+    """
+    store = get_match_store()
+    state = store.get_sync_state(puuid) or {'oldest_time': None, 'backfill_done': False}
+    if state['backfill_done']:
+        return []
+    
+    oldest_time = state['oldest_time']
+    match_details = []
+    with request_class('backfill'):
+        try:
+            for _ in range(max_chunks):
+                matches = get_match_ids(region, puuid, count=chunk_size, end_time=oldest_time)
+                chunk = _match_rows(region, puuid, matches, concurrency)
+                match_details.extend(chunk)
+                done = len(matches) < chunk_size
+            
+                fields = {'backfill_done': done}
+                if chunk:
+                    # Continue just before the oldest game in this chunk
+                    oldest_time = min(row.gameCreation for row in chunk) // 1000 - 1
+                    fields['oldest_time'] = oldest_time
+                store.update_sync_state(puuid, **fields)
+                if done or not chunk:
+                    break
+        except RiotAPIError as err:
+            event('match_history_error', f"Failed to backfill match history: {err}", level='error',
+                  operation='backfill', puuid=puuid, error=str(err))
+    return match_details
 
 #Function to take a summoners natch data
-def retrieve_match_data(game_name, tag_line, count):
-    """Retrieve all match-related data for a player."""
-    print(f"Requesting summoner data for '{game_name}#{tag_line}'")
-    puuid = get_summoner_puuid_by_riot_id(game_name, tag_line)
+def retrieve_match_data(game_name, tag_line, count, incremental=False):
+    """Retrieve all match-related data for a player.
+
+    With incremental=True only matches played since the last sync are fetched.
+    """
+    event('account_lookup', f"Requesting summoner data for '{game_name}#{tag_line}'",
+          game_name=game_name, tag_line=tag_line)
+    with stage('account_lookup'):
+        puuid = get_summoner_puuid_by_riot_id(game_name, tag_line)
     
     if not puuid:
-        print("Failed to retrieve PUUID for summoner.")
+        event('match_data_unavailable', "Failed to retrieve PUUID for summoner.", level='error', reason='puuid')
         return None
 
-    print(f"PUUID: {puuid}")
+    event('account_resolved', f"PUUID: {puuid}", puuid=puuid)
 
-    summoner_id = get_summoner_id_by_puuid(puuid)
+    with stage('summoner_lookup'):
+        summoner_id = get_summoner_id_by_puuid(puuid)
     
     if summoner_id:
-        print(f"Summoner ID: {summoner_id}")
+        event('summoner_resolved', f"Summoner ID: {summoner_id}", summoner_id=summoner_id)
     else:
-        print("Failed to retrieve summoner ID.")
+        event('summoner_unresolved', "Failed to retrieve summoner ID.", level='warning', puuid=puuid)
 
     # Check if player is in game
-    in_game_data = get_live_game_data(summoner_id)
+    with stage('spectator'):
+        in_game_data = get_live_game_data(summoner_id)
     if in_game_data:
-        print("Player is currently in-game!")
+        event('in_game', "Player is currently in-game!", puuid=puuid)
         
         for participant in in_game_data['participants']:
             riot_id = participant.get('riotId', 'Unknown')
             champion_id = participant['championId']
-            print(f"{riot_id} - Champion ID: {champion_id}")
+            event('in_game_participant', f"{riot_id} - Champion ID: {champion_id}",
+                  riot_id=riot_id, champion_id=champion_id)
     else:
-        print("Player is not in-game. Retrieving match history...")
+        event('not_in_game', "Player is not in-game. Retrieving match history...", puuid=puuid)
 
-    match_history = get_match_history("americas", puuid, count)
+    with stage('match_history'):
+        if incremental:
+            match_history = sync_match_history("americas", puuid, count)
+        else:
+            match_history = get_match_history("americas", puuid, count)
     return match_history
 
 #Function to display champion_stats
-def display_champion_stats(game_name, tag_line):
+def display_champion_stats(game_name, tag_line, single_pass=False, from_rollups=False):
     """Display champion stats with improved formatting."""
     print("\nFetching champion mastery and win rate data...")
-    stats = get_champion_stats(game_name, tag_line)
+    with stage('display_champion_stats'):
+        stats = get_champion_stats(game_name, tag_line, single_pass=single_pass, from_rollups=from_rollups)
     
     if stats:
         print("\nTop 5 Mastery Champions (sorted by win rate):")
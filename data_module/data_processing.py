@@ -1,13 +1,30 @@
 # data_processing.py
+import os
+
 import pandas as pd
 
+from data_module.match_dataset import append_matches, count_matches, read_matches
+
 
 def save_data(data, filename):
-    df = pd.DataFrame(data)
-    df.to_csv(filename, index=False)
+    # CSV files are still rewritten; anything else is the partitioned match dataset
+    if filename.endswith('.csv'):
+        df = pd.DataFrame(data)
+        df.to_csv(filename, index=False)
+    else:
+        append_matches(data, filename)
+
+def load_data(file_path, columns=None, puuid=None):
+    if os.path.isdir(file_path):
+        return read_matches(file_path, columns=columns, puuid=puuid)
+    df = pd.read_csv(file_path, usecols=columns)
+    return df if puuid is None else df[df['puuid'] == puuid]
 
-def load_data(file_path):
-    return pd.read_csv(file_path)
+def count_data(file_path):
+    # The dataset's row count comes from its metadata; a CSV has to be read, if only one column
+    if os.path.isdir(file_path):
+        return count_matches(file_path)
+    return len(pd.read_csv(file_path, usecols=[0]))
 
 #Calculaing winrate and duration of matches
 def calculate_metrics(match_data):
@@ -20,4 +37,4 @@ def calculate_metrics(match_data):
 
 def feature_engineering(match_data):
     match_data['kda'] = (match_data['kills'] + match_data['assists']) / (match_data['deaths'].replace(0, 1))
-    return match_data
\ No newline at end of file
+    return match_data
@@ -0,0 +1,112 @@
+# features.py
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from data_set_handling.champion_mapping import champion_mapping
+
+# Riot teamPosition values; anything else (including '') is coded as "other"
+ROLES = ['TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY']
+NUMERIC_FEATURES = [
+    'minutes', 'kills', 'deaths', 'assists', 'vision_score', 'kda',
+    'kills_per_min', 'deaths_per_min', 'assists_per_min', 'vision_per_min',
+]
+
+
+def numeric_features(duration, kills, deaths, assists, vision, out=None):
+    """The NUMERIC_FEATURES block from float32 arrays of raw stats (duration in seconds).
+
+    With `out` (a float32 array of shape (rows, len(NUMERIC_FEATURES)), or a
+    view of one) the block is written there and nothing is allocated.
+    """
+    if out is None:
+        out = np.empty((len(kills), len(NUMERIC_FEATURES)), dtype=np.float32)
+    minutes, kda, per_minute = out[:, 0], out[:, 5], out[:, 6:]
+    np.divide(duration, 60, out=minutes)
+    np.maximum(minutes, 1, out=minutes)
+    for column, values in enumerate((kills, deaths, assists, vision), start=1):
+        out[:, column] = values
+    np.maximum(deaths, 1, out=per_minute[:, 0])  # Scratch until the per-minute columns are filled
+    np.add(kills, assists, out=kda)
+    np.divide(kda, per_minute[:, 0], out=kda)
+    np.divide(out[:, 1:5], minutes[:, None], out=per_minute)
+    return out
+
+
+class FeatureBuilder:
+    """Turns match rows into the model's numeric feature matrix.
+
+    Champion and role are integer-coded against fixed vocabularies and
+    one-hot encoded, so training and live inference always produce the same
+    columns. Everything is computed on whole columns at once.
+    """
+
+    def __init__(self, champion_ids=None, roles=ROLES):
+        self.champion_ids = np.array(sorted(champion_ids or champion_mapping), dtype=np.int64)
+        self.roles = list(roles)
+
+    @property
+    def feature_names(self):
+        return (
+            NUMERIC_FEATURES
+            + [f'champion_{champion_id}' for champion_id in self.champion_ids]
+            + ['champion_other']
+            + [f'role_{role}' for role in self.roles]
+            + ['role_other']
+        )
+
+    def champion_codes(self, champion_ids):
+        """Integer code per champion ID; unknown champions share the last code."""
+        ids = np.asarray(champion_ids, dtype=np.int64)
+        positions = np.clip(np.searchsorted(self.champion_ids, ids), 0, len(self.champion_ids) - 1)
+        known = self.champion_ids[positions] == ids
+        return np.where(known, positions, len(self.champion_ids))
+
+    def role_codes(self, roles):
+        """Integer code per role; unknown or missing roles share the last code."""
+        other = len(self.roles)
+        if isinstance(getattr(roles, 'dtype', None), pd.CategoricalDtype):
+            # Recode the (few) categories instead of every row; code -1 (missing) hits the last entry
+            lookup = np.array(
+                [self.roles.index(role) if role in self.roles else other for role in roles.cat.categories] + [other]
+            )
+            return lookup[roles.cat.codes.to_numpy()]
+        codes = pd.Categorical(np.asarray(roles, dtype=object), categories=self.roles).codes.astype(np.int64)
+        return np.where(codes < 0, other, codes)
+
+    def numeric(self, match_data):
+        """Dense float32 block of raw and derived per-minute stats."""
+        return numeric_features(
+            match_data['duration'].to_numpy(dtype=np.float32),
+            match_data['kills'].to_numpy(dtype=np.float32),
+            match_data['deaths'].to_numpy(dtype=np.float32),
+            match_data['assists'].to_numpy(dtype=np.float32),
+            match_data['vision_score'].to_numpy(dtype=np.float32),
+        )
+
+    def transform(self, match_data, sparse=True):
+        """Feature matrix for a DataFrame of match rows (CSR, or dense with sparse=False)."""
+        numeric = self.numeric(match_data)
+        champions = self.champion_codes(match_data['championId'])
+        roles = self.role_codes(match_data['role'])
+        if not sparse:
+            n_champions = len(self.champion_ids) + 1
+            X = np.zeros((len(numeric), len(self.feature_names)), dtype=np.float32)
+            rows = np.arange(len(numeric))
+            X[:, :len(NUMERIC_FEATURES)] = numeric
+            X[rows, len(NUMERIC_FEATURES) + champions] = 1
+            X[rows, len(NUMERIC_FEATURES) + n_champions + roles] = 1
+            return X
+        # Every row has the same layout (numeric block, one champion, one role),
+        # so the CSR arrays can be written directly without sorting or stacking
+        n, k = numeric.shape
+        n_champions = len(self.champion_ids) + 1
+        data = np.empty((n, k + 2), dtype=np.float32)
+        data[:, :k] = numeric
+        data[:, k:] = 1
+        indices = np.empty((n, k + 2), dtype=np.int32)
+        indices[:, :k] = np.arange(k, dtype=np.int32)
+        indices[:, k] = k + champions
+        indices[:, k + 1] = k + n_champions + roles
+        indptr = np.arange(0, n * (k + 2) + 1, k + 2, dtype=np.int64)
+        return sp.csr_matrix((data.ravel(), indices.ravel(), indptr), shape=(n, len(self.feature_names)))
@@ -0,0 +1,480 @@
+# fetch_engine.py
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import functools
+import random
+import threading
+import time
+
+from config.config import RATE_LIMITS, FETCH_CONCURRENCY, FETCH_MAX_RETRIES, INTERACTIVE_RESERVE
+from data_module.metrics import get_metrics
+
+# Extra time before a spent token comes back, to absorb clock skew with Riot
+WINDOW_SLACK = 0.05
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+PRIORITIES = ('interactive', 'live', 'backfill')  # Request classes, highest first
+
+
+class TokenBucket:
+    """Token bucket for one rate-limit window, e.g. 20 requests per second.
+
+    A spent token returns exactly one window after it was taken, so no
+    window-sized interval can ever see more than `limit` requests. That keeps
+    us inside Riot's fixed windows no matter where they start.
+    """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._spent = collections.deque(maxlen=limit)
+
+    def wait_time(self, now, reserve=0):
+        """Seconds until a token is free with `reserve` more left over (0 if that's now)."""
+        oldest = len(self._spent) - self.limit + reserve  # Must have come back first
+        if oldest < 0:
+            return 0.0
+        return max(0.0, self._spent[oldest] + self.window + WINDOW_SLACK - now)
+
+    def take(self, now):
+        self._spent.append(now)
+
+
+class RegionLimiter:
+    """Rate limiter for one routing value (`americas`, `na1`, ...).
+
+    A request needs a token from every window at once. A 429 blocks the
+    whole routing value until its Retry-After has passed.
+    """
+
+    def __init__(self, limits):
+        self.buckets = [TokenBucket(limit, window) for limit, window in limits]
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait(self, now, reserve):
+        return max([self.blocked_until - now]
+                   + [b.wait_time(now, min(int(b.limit * reserve), b.limit - 1)) for b in self.buckets])
+
+    def wait_time(self, reserve=0.0):
+        """Seconds until try_acquire(reserve) would take a token (0 if it would now)."""
+        with self._lock:
+            return self._wait(time.monotonic(), reserve)
+
+    def try_acquire(self, reserve=0.0):
+        """Take a token if one is free. Returns 0, or the seconds to wait before retrying.
+
+        With a `reserve`, that share of every window's tokens is left for
+        others: a token is only taken if the reserve is still free after it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._wait(now, reserve)
+            if wait > 0:
+                return wait
+            for bucket in self.buckets:
+                bucket.take(now)
+            return 0.0
+
+    def block(self, seconds):
+        """Stop handing out tokens for `seconds`, e.g. after a 429."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class DeadlineExceeded(TimeoutError):
+    """A call was still waiting for a rate-limit token when its deadline passed."""
+
+
+class Ticket:
+    """One call's place in a RequestScheduler: its class, tenant, deadline (time.monotonic()) and budget."""
+
+    __slots__ = ('priority', 'tenant', 'deadline', 'budget', 'future', 'promoted')
+
+    def __init__(self, priority='interactive', tenant=None, deadline=None, budget=None):
+        self.priority = priority
+        self.tenant = tenant
+        self.deadline = deadline
+        self.budget = budget
+        self.future = None
+        self.promoted = None  # For a shared call, a future resolved when it's promoted to interactive
+
+
+_request_class = contextvars.ContextVar('lana_request_class', default=('interactive', None, None))
+
+@contextlib.contextmanager
+def request_class(priority, tenant=None, timeout=None):
+    """Make the Riot calls in this block, in this thread, as `priority` on behalf of `tenant`.
+
+    `priority` is one of PRIORITIES; calls are interactive unless told
+    otherwise. `tenant` defaults to the enclosing block's. With a `timeout`,
+    calls still queued for a token that many seconds from now fail with
+    DeadlineExceeded instead of waiting on.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown request class {priority!r}; expected one of {', '.join(PRIORITIES)}")
+    _, outer_tenant, outer_deadline = _request_class.get()
+    tenant = outer_tenant if tenant is None else tenant
+    deadline = None if timeout is None else time.monotonic() + timeout
+    if outer_deadline is not None:
+        deadline = outer_deadline if deadline is None else min(deadline, outer_deadline)
+    token = _request_class.set((priority, tenant, deadline))
+    try:
+        yield
+    finally:
+        _request_class.reset(token)
+
+def carry_request_class(fn):
+    """Wrap fn to run under the caller's request class in any thread, e.g. in a thread pool."""
+    current = _request_class.get()
+
+    def run(*args, **kwargs):
+        token = _request_class.set(current)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _request_class.reset(token)
+    return run
+
+
+class RequestScheduler:
+    """Hands out one routing value's rate-limit tokens by class, then fairly between tenants.
+
+    Waiting calls are queued per class and, within a class, per tenant. When
+    the limiter has a token, it goes to the highest class with anyone
+    waiting, and within that class to tenants in turn, so one tenant's
+    thousand-call backfill doesn't hold up another tenant's single lookup.
+    Only interactive calls may take the last `reserve` share of each
+    window's tokens, so they rarely wait for a window to come round even
+    when a crawl is using everything else. A call with a budget also needs
+    a budget token, taken together with the limiter's; a tenant out of
+    budget is passed over rather than holding up the others. Interactive
+    calls skip their budget. A call that is cancelled or passes its
+    deadline leaves the queue without taking a token. Only used on the
+    engine's event loop.
+    """
+
+    def __init__(self, limiter, region, reserve=INTERACTIVE_RESERVE):
+        self.limiter = limiter
+        self.region = region
+        self.reserve = reserve
+        self._waiting = {priority: collections.OrderedDict() for priority in PRIORITIES}  # tenant -> tickets
+        self._dispatcher = None
+        self._arrived = asyncio.Event()
+
+    def _enqueue(self, ticket):
+        self._waiting[ticket.priority].setdefault(ticket.tenant, collections.deque()).append(ticket)
+        self._arrived.set()  # It may be able to go before whatever the dispatcher is waiting for
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def promote(self, ticket, priority):
+        """Move a waiting ticket up to a higher class, e.g. when an interactive call joins a backfill one."""
+        if PRIORITIES.index(priority) >= PRIORITIES.index(ticket.priority):
+            return
+        queue = self._waiting[ticket.priority].get(ticket.tenant)
+        waiting = ticket.future is not None and not ticket.future.done() and queue is not None and ticket in queue
+        if waiting:
+            queue.remove(ticket)
+        ticket.priority = priority
+        if priority == PRIORITIES[0] and ticket.promoted is not None and not ticket.promoted.done():
+            ticket.promoted.set_result(None)  # Stop waiting for a place under a backfill's concurrency limit
+        if waiting:
+            self._enqueue(ticket)
+
+    def _next(self):
+        # Returns (tenants, tenant, queue) for the first ticket that can go now, or (None, seconds to wait)
+        shortest = None
+        for priority, tenants in self._waiting.items():
+            interactive = priority == PRIORITIES[0]
+            limiter_wait = self.limiter.wait_time(0.0 if interactive else self.reserve)
+            for tenant, queue in list(tenants.items()):
+                while queue and queue[0].future.done():  # Cancelled or past its deadline
+                    queue.popleft()
+                if not queue:
+                    del tenants[tenant]
+                    continue
+                budget = None if interactive else queue[0].budget
+                wait = limiter_wait if budget is None else max(limiter_wait, budget.wait_time())
+                if wait <= 0:
+                    return (tenants, tenant, queue), 0.0
+                shortest = wait if shortest is None else min(shortest, wait)
+        return None, shortest
+
+    async def _dispatch(self):
+        while True:
+            picked, wait = self._next()
+            if picked is None:
+                if wait is None:
+                    self._dispatcher = None
+                    return
+                self._arrived.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._arrived.wait(), wait)
+                continue  # Someone who can go sooner may have arrived meanwhile
+            tenants, tenant, queue = picked
+            ticket = queue.popleft()
+            interactive = ticket.priority == PRIORITIES[0]
+            self.limiter.try_acquire(0.0 if interactive else self.reserve)  # Free: _next just checked
+            if ticket.budget is not None and not interactive:
+                ticket.budget.try_acquire()
+            ticket.future.set_result(None)
+            if queue:
+                tenants.move_to_end(tenant)  # Next turn goes to the next tenant in this class
+            else:
+                del tenants[tenant]
+
+    async def acquire(self, ticket):
+        """Wait for a token for this ticket."""
+        metrics = get_metrics()
+        priority = ticket.priority
+        ticket.future = asyncio.get_running_loop().create_future()
+        self._enqueue(ticket)
+        metrics.add_gauge('lana_scheduler_waiting', 1, region=self.region, priority=priority)
+        try:
+            while not ticket.future.done():
+                # The deadline is read each time round, since a call joining this one can extend it
+                timeout = None if ticket.deadline is None else ticket.deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    raise DeadlineExceeded(f"No {self.region} rate-limit token before the deadline")
+                await asyncio.wait([ticket.future], timeout=timeout)
+        finally:
+            ticket.future.cancel()  # No-op once granted; otherwise leaves the queue
+            metrics.add_gauge('lana_scheduler_waiting', -1, region=self.region, priority=priority)
+
+
+def _status_code(err):
+    response = getattr(err, 'response', None)
+    return getattr(response, 'status_code', None)
+
+def _retry_after(err):
+    response = getattr(err, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+def is_transient(err):
+    """Whether a failed call may succeed later: a 429, a 5xx, a network error or a missed deadline."""
+    status = _status_code(err)
+    if status is None:
+        return isinstance(err, OSError)  # Network errors; DeadlineExceeded is a TimeoutError too
+    return status == 429 or status >= 500
+
+def _backoff(attempt):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class FetchEngine:
+    """Shared asyncio engine that runs Riot API calls under the key's rate limits.
+
+    The event loop runs in a background thread, so the synchronous functions
+    in data_collecter can hand it work from any thread. Blocking calls run in
+    a worker pool once the routing value's scheduler grants a token, in
+    order of request class (see request_class) and fairly between tenants.
+    """
+
+    def __init__(self, limits=RATE_LIMITS, concurrency=FETCH_CONCURRENCY, max_retries=FETCH_MAX_RETRIES):
+        self.limits = limits
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(32, concurrency * 2), thread_name_prefix='fetch-worker'
+        )
+        self._flights = {}  # key -> [task, waiters, ticket]; only touched on the loop thread
+        self._schedulers = {}  # Likewise
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='fetch-engine', daemon=True)
+        self._thread.start()
+
+    def limiter(self, region):
+        """Return the limiter for a routing value, creating it on first use."""
+        with self._limiters_lock:
+            if region not in self._limiters:
+                self._limiters[region] = RegionLimiter(self.limits)
+            return self._limiters[region]
+
+    def scheduler(self, region):
+        """Return the request scheduler for a routing value; only call this on the event loop."""
+        if region not in self._schedulers:
+            self._schedulers[region] = RequestScheduler(self.limiter(region), region)
+        return self._schedulers[region]
+
+    async def _call(self, region, fn, args, ticket):
+        limiter = self.limiter(region)
+        scheduler = self.scheduler(region)
+        metrics = get_metrics()
+        for attempt in range(self.max_retries + 1):
+            waited = time.monotonic()
+            await scheduler.acquire(ticket)
+            # Queue wait per class, the number to watch for interactive latency
+            metrics.observe('lana_rate_limit_wait_seconds', time.monotonic() - waited, region=region,
+                            priority=ticket.priority)
+            metrics.add_gauge('lana_fetch_in_flight', 1, region=region)
+            try:
+                return await self._loop.run_in_executor(self._executor, fn, region, *args)
+            except Exception as err:
+                if not is_transient(err):
+                    raise
+                status = _status_code(err)
+                if status == 429:
+                    retry_after = _retry_after(err)
+                    limiter.block(retry_after if retry_after is not None else _backoff(attempt))
+                if attempt == self.max_retries:
+                    raise
+                reason = 'rate_limited' if status == 429 else 'server_error' if status else 'network'
+                metrics.inc('lana_fetch_retries_total', region=region, reason=reason)
+                if status != 429:
+                    await asyncio.sleep(_backoff(attempt))
+            finally:
+                metrics.add_gauge('lana_fetch_in_flight', -1, region=region)
+
+    async def _hold(self, semaphore, ticket):
+        # Wait for a place under a map's concurrency limit. Returns False if
+        # the call was promoted to interactive first; it then goes without one.
+        if ticket.promoted is None:  # Not shared, so never promoted
+            await semaphore.acquire()
+            return True
+        if ticket.promoted.done():
+            return False
+        acquiring = self._loop.create_task(semaphore.acquire())
+        try:
+            await asyncio.wait([acquiring, ticket.promoted], return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            if acquiring.done() and not acquiring.cancelled():
+                semaphore.release()
+            acquiring.cancel()
+            raise
+        if acquiring.done():
+            return True
+        acquiring.cancel()  # A place granted meanwhile is passed on by Semaphore.acquire
+        return False
+
+    async def _queued(self, region, fn, args, semaphore, ticket):
+        # Queue depth: calls handed to the engine that haven't finished yet
+        metrics = get_metrics()
+        metrics.add_gauge('lana_fetch_queue_depth', 1, region=region)
+        try:
+            if semaphore is None or not await self._hold(semaphore, ticket):
+                return await self._call(region, fn, args, ticket)
+            try:
+                return await self._call(region, fn, args, ticket)
+            finally:
+                semaphore.release()
+        finally:
+            metrics.add_gauge('lana_fetch_queue_depth', -1, region=region)
+
+    def _land(self, key, task):
+        if self._flights.get(key, [None])[0] is task:
+            del self._flights[key]
+
+    async def _shared(self, key, region, fn, args, semaphore, transform, ticket):
+        # Join the in-flight call for this key, or start it. The call is shielded
+        # from any one caller's cancellation and only cancelled once every
+        # caller waiting on it has given up.
+        if key is None:
+            result = await self._queued(region, fn, args, semaphore, ticket)
+        else:
+            flight = self._flights.get(key)
+            if flight is None:
+                ticket.promoted = self._loop.create_future()
+                task = self._loop.create_task(self._queued(region, fn, args, semaphore, ticket))
+                task.add_done_callback(functools.partial(self._land, key))
+                flight = self._flights[key] = [task, 0, ticket]
+            else:
+                get_metrics().inc('lana_fetch_coalesced_total', region=region, endpoint=key[0])
+                # The shared call waits as the most urgent of its callers, for as long as the most patient
+                shared = flight[2]
+                self.scheduler(region).promote(shared, ticket.priority)
+                if shared.deadline is not None:
+                    shared.deadline = None if ticket.deadline is None else max(shared.deadline, ticket.deadline)
+            flight[1] += 1
+            try:
+                result = await asyncio.shield(flight[0])
+            except asyncio.CancelledError:
+                if flight[1] == 1 and not flight[0].done():
+                    flight[0].cancel()
+                    self._land(key, flight[0])  # Later callers start afresh
+                raise
+            finally:
+                flight[1] -= 1
+        if transform is not None:
+            # Per caller, in a worker, since callers may want different things from one response
+            result = await self._loop.run_in_executor(self._executor, transform, result)
+        return result
+
+    def _schedule(self, region, fn, args, key=None, semaphore=None, transform=None, budget=None):
+        # The request class is read in the calling thread, where request_class was set
+        ticket = Ticket(*_request_class.get(), budget=budget)
+        if key is None and transform is None:
+            coroutine = self._queued(region, fn, args, semaphore, ticket)
+        else:
+            coroutine = self._shared(key, region, fn, args, semaphore, transform, ticket)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def budget(self, share):
+        """A limiter for `share` of the key's rate limits, e.g. 0.5 for half of each window.
+
+        Passed as `budget`, it caps one workload's request rate on top of the
+        shared limits, leaving the rest of the key for everything else.
+        """
+        return RegionLimiter([(max(1, int(limit * share)), window) for limit, window in self.limits])
+
+    def submit(self, region, fn, *args, key=None, budget=None):
+        """Schedule fn(region, *args) and return a concurrent.futures.Future.
+
+        With a `key`, a tuple starting with a short endpoint name such as
+        ('match.by_id', match_id), the call is shared with any in-flight call
+        for the same key. Shared results must be treated as read-only. With
+        a `budget` (see budget()), the call also needs a token from it.
+        """
+        return self._schedule(region, fn, args, key, budget=budget)
+
+    def call(self, region, fn, *args, key=None, budget=None):
+        """Run fn(region, *args) under the rate limits and return its result."""
+        future = self.submit(region, fn, *args, key=key, budget=budget)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()  # E.g. Ctrl+C: give up the queued call's place
+            raise
+
+    def map(self, region, fn, items, concurrency=None, key=None, transform=None, budget=None):
+        """Run fn(region, item) for every item, yielding (item, future) as each finishes.
+
+        At most `concurrency` calls are in flight at once. Closing the
+        generator early cancels every call that hasn't finished. With
+        `key(item)`, calls are coalesced like `submit`'s; `transform(result)`
+        then runs in a worker for this caller alone before the future is done.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+        futures = {
+            self._schedule(region, fn, (item,), key(item) if key else None, semaphore, transform, budget): item
+            for item in items
+        }
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                yield futures[future], future
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_fetch_engine():
+    """Return the process-wide fetch engine, starting it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = FetchEngine()
+    return _engine
@@ -0,0 +1,153 @@
+# http_client.py
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.config import (
+    API_KEY, DDRAGON_URL, HTTP_CONNECT_TIMEOUT, HTTP_POOL_SIZE, HTTP_READ_TIMEOUT, RIOT_API_URL,
+)
+from data_module.metrics import endpoint_name, get_metrics
+
+LIVE_CLIENT_URL = "https://127.0.0.1:2999"
+
+
+class RiotAPIError(requests.exceptions.RequestException):
+    """A failed request, classified so callers don't have to inspect status codes.
+
+    `kind` is one of: unauthorized, forbidden, not_found, rate_limited,
+    server_error, client_error, network.
+    """
+
+    def __init__(self, kind, message, response=None):
+        super().__init__(message, response=response)
+        self.kind = kind
+        self.status_code = getattr(response, 'status_code', None)
+
+
+def classify_status(status_code):
+    """Map an HTTP status code to a RiotAPIError kind."""
+    if status_code == 401:
+        return 'unauthorized'
+    if status_code == 403:
+        return 'forbidden'
+    if status_code == 404:
+        return 'not_found'
+    if status_code == 429:
+        return 'rate_limited'
+    if status_code >= 500:
+        return 'server_error'
+    return 'client_error'
+
+
+class HttpClient:
+    """Keep-alive HTTP client for one family of endpoints.
+
+    Headers are set once on the session and urllib3 keeps a connection pool
+    per host, so repeated calls skip the TCP and TLS handshakes.
+    """
+
+    def __init__(self, base_url, headers=None, verify=True, name='http'):
+        self.base_url = base_url
+        self.name = name
+        self.verify = verify
+        self.timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        self.session = requests.Session()
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._requests = 0
+        self._pools = {}
+        self._retired_connections = 0
+        self._lock = threading.Lock()
+
+    def get(self, path, params=None, **url_args):
+        """GET base_url + path and return the response, raising RiotAPIError on failure."""
+        url = self.base_url.format(**url_args) + path
+        labels = {'client': self.name, 'endpoint': endpoint_name(path), 'region': url_args.get('region', '')}
+        metrics = get_metrics()
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout, verify=self.verify)
+        except requests.exceptions.RequestException as err:
+            metrics.inc('lana_http_requests_total', status='network', **labels)
+            raise RiotAPIError('network', f"Request error: {err}") from err
+        finally:
+            metrics.observe('lana_http_request_seconds', time.perf_counter() - started, **labels)
+        metrics.inc('lana_http_requests_total', status=response.status_code, **labels)
+        self._track(response)
+        if response.status_code >= 400:
+            raise RiotAPIError(
+                classify_status(response.status_code),
+                f"{response.status_code} error for url: {url}",
+                response=response,
+            )
+        return response
+
+    def get_json(self, path, params=None, **url_args):
+        return self.get(path, params, **url_args).json()
+
+    def _track(self, response):
+        # urllib3 counts new connections per host pool; remember each pool we
+        # have seen so the totals survive pools being replaced.
+        pool = getattr(response.raw, '_pool', None)
+        with self._lock:
+            self._requests += 1
+            if pool is None:
+                return
+            key = (pool.scheme, pool.host, pool.port)
+            previous = self._pools.get(key)
+            if previous is not None and previous is not pool:
+                self._retired_connections += previous.num_connections
+            self._pools[key] = pool
+
+    def stats(self):
+        """Request count, new connections opened and the connection reuse rate."""
+        with self._lock:
+            connections = self._retired_connections + sum(p.num_connections for p in self._pools.values())
+            requests_made = self._requests
+        reuse_rate = 1 - connections / requests_made if requests_made else 0.0
+        return {
+            'requests': requests_made,
+            'connections': connections,
+            'reuse_rate': max(0.0, reuse_rate),
+        }
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _client(name, factory):
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+def riot_client():
+    """Client for the Riot API, with the API key header attached."""
+    return _client('riot', lambda: HttpClient(RIOT_API_URL, headers={"X-Riot-Token": API_KEY}, name='riot'))
+
+def ddragon_client():
+    """Client for Data Dragon static data."""
+    return _client('ddragon', lambda: HttpClient(DDRAGON_URL, name='ddragon'))
+
+def live_client():
+    """Client for the local League live client API (self-signed certificate)."""
+    return _client('live', lambda: HttpClient(LIVE_CLIENT_URL, verify=False, name='live'))
+
+def riot_get(region, path, params=None):
+    """GET a Riot API path for a routing value and return the decoded JSON."""
+    return riot_client().get_json(path, params, region=region)
+
+def riot_get_bytes(region, path, params=None):
+    """GET a Riot API path and return the undecoded response body."""
+    return riot_client().get(path, params, region=region).content
+
+def connection_stats():
+    """Connection reuse statistics for every client created so far."""
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: client.stats() for name, client in clients.items()}
@@ -0,0 +1,169 @@
+# live_scoring.py
+import numpy as np
+
+from data_module.features import NUMERIC_FEATURES, numeric_features
+from data_set_handling.champion_mapping import champion_mapping
+
+CHAMPION_IDS_BY_NAME = {name: champion_id for champion_id, name in champion_mapping.items()}
+LEAF_CHECK_EVERY = 4  # Levels between checks for whether every path has reached a leaf
+
+
+class CompiledForest:
+    """A fitted RandomForestClassifier flattened into padded NumPy node arrays.
+
+    Every tree is walked at once, one depth level per step, using only
+    `out=` operations on buffers allocated up front, so scoring a batch of
+    at most `max_rows` rows allocates nothing. Leaves point back to
+    themselves, so extra steps past a leaf are harmless.
+    """
+
+    def __init__(self, forest, max_rows=10):
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        classes = list(forest.classes_)
+        positive = classes.index(1) if 1 in classes else None  # None: trained on losses only
+        n_trees = len(trees)
+        width = max(tree.node_count for tree in trees)
+        self.n_features = forest.n_features_in_
+        self.depth = max(tree.max_depth for tree in trees)
+
+        node_ids = np.arange(width)
+        feature = np.zeros((n_trees, width), dtype=np.intp)
+        threshold = np.full((n_trees, width), np.inf)
+        left = np.tile(node_ids, (n_trees, 1))
+        right = np.tile(node_ids, (n_trees, 1))
+        value = np.zeros((n_trees, width))
+        is_leaf = np.ones((n_trees, width), dtype=bool)
+        for t, tree in enumerate(trees):
+            n = tree.node_count
+            is_split = tree.children_left[:n] >= 0
+            feature[t, :n] = np.where(is_split, tree.feature[:n], 0)
+            threshold[t, :n] = np.where(is_split, tree.threshold[:n], np.inf)
+            left[t, :n] = np.where(is_split, tree.children_left[:n], node_ids[:n])
+            right[t, :n] = np.where(is_split, tree.children_right[:n], node_ids[:n])
+            is_leaf[t, :n] = ~is_split
+            counts = tree.value[:n, 0, :]
+            if positive is not None:
+                value[t, :n] = counts[:, positive] / np.maximum(counts.sum(axis=1), 1e-12)
+
+        # Node indices become offsets into the flattened arrays. Children are
+        # interleaved so one lookup at 2 * node + went_right finds the next node.
+        offsets = (np.arange(n_trees) * width)[:, None]
+        self._feature = feature.ravel()
+        self._threshold = threshold.ravel()
+        self._children = np.stack([left + offsets, right + offsets], axis=-1).ravel()
+        self._value = value.ravel()
+        self._is_leaf = is_leaf.ravel()
+        self._roots = np.broadcast_to(offsets.T, (max_rows, n_trees)).copy()
+
+        # Scratch buffers for up to max_rows rows
+        self.max_rows = max_rows
+        self._x = np.zeros((max_rows, self.n_features))
+        self._row_offsets = (np.arange(max_rows) * self.n_features)[:, None]
+        shape = (max_rows, n_trees)
+        self._node = np.empty(shape, dtype=np.intp)
+        self._next_node = np.empty(shape, dtype=np.intp)
+        self._index = np.empty(shape, dtype=np.intp)
+        self._x_value = np.empty(shape)
+        self._split = np.empty(shape)
+        self._go_right = np.empty(shape, dtype=bool)
+        self._at_leaf = np.empty(shape, dtype=bool)
+        self._leaf_value = np.empty(shape)
+        self._proba = np.empty(max_rows)
+
+    def predict_proba(self, X):
+        """Probability of class 1 for each row of X (at most max_rows rows).
+
+        Returns a view of an internal buffer that is overwritten on the next call.
+        """
+        rows = X.shape[0]
+        x = self._x[:rows]
+        np.copyto(x, X)
+        flat_x = self._x.ravel()
+        node, next_node, index = self._node[:rows], self._next_node[:rows], self._index[:rows]
+        x_value, split, go_right = self._x_value[:rows], self._split[:rows], self._go_right[:rows]
+
+        # mode='clip' keeps np.take from buffering its output (indices are always in range)
+        at_leaf = self._at_leaf[:rows]
+        np.copyto(node, self._roots[:rows])
+        for level in range(self.depth):
+            if level % LEAF_CHECK_EVERY == LEAF_CHECK_EVERY - 1:
+                np.take(self._is_leaf, node, out=at_leaf, mode='clip')
+                if at_leaf.all():  # Every path has reached its leaf
+                    break
+            np.take(self._feature, node, out=index, mode='clip')
+            np.add(index, self._row_offsets[:rows], out=index)
+            np.take(flat_x, index, out=x_value, mode='clip')
+            np.take(self._threshold, node, out=split, mode='clip')
+            np.greater(x_value, split, out=go_right)
+            np.multiply(node, 2, out=node)
+            np.add(node, go_right, out=node)
+            np.take(self._children, node, out=next_node, mode='clip')
+            node, next_node = next_node, node
+
+        leaf_value = self._leaf_value[:rows]
+        np.take(self._value, node, out=leaf_value, mode='clip')
+        proba = self._proba[:rows]
+        np.mean(leaf_value, axis=1, out=proba)
+        return proba
+
+
+class LiveScorer:
+    """Win probability for the active player's team from live client snapshots.
+
+    Each player's live totals are mapped into the model's feature space:
+    game time stands in for duration and ward score for vision score. The
+    compiled forest then scores all ten players. The team's probability is
+    the mean of its players' win probabilities and the enemies' loss
+    probabilities.
+    """
+
+    def __init__(self, saved_model=None):
+        if saved_model is None:
+            from data_module.prediction_model import load_model
+
+            saved_model = load_model()
+        self.builder = saved_model['builder']
+        self.forest = CompiledForest(saved_model['model'])
+        self._X = np.zeros((self.forest.max_rows, len(self.builder.feature_names)), dtype=np.float32)
+        self._roster = None
+        self._raw = np.zeros((5, self.forest.max_rows), dtype=np.float32)
+
+    def _set_roster(self, players):
+        # Champion and role columns only change when the roster does
+        n_numeric = len(NUMERIC_FEATURES)
+        n_champions = len(self.builder.champion_ids) + 1
+        champion_ids = [CHAMPION_IDS_BY_NAME.get(player.get('championName'), -1) for player in players]
+        champions = self.builder.champion_codes(champion_ids)
+        roles = self.builder.role_codes([player.get('position') or None for player in players])
+        self._X[:] = 0
+        rows = np.arange(len(players))
+        self._X[rows, n_numeric + champions] = 1
+        self._X[rows, n_numeric + n_champions + roles] = 1
+        self._roster = [(player.get('riotId'), player.get('championName')) for player in players]
+
+    def score(self, snapshot):
+        """Win probability (0-1) for the active player's team, or None without players."""
+        players = snapshot.get('allPlayers', [])[:self.forest.max_rows]
+        if not players:
+            return None
+        if self._roster != [(player.get('riotId'), player.get('championName')) for player in players]:
+            self._set_roster(players)
+
+        n = len(players)
+        raw = self._raw[:, :n]
+        raw[0] = snapshot.get('gameData', {}).get('gameTime', 0.0)
+        for i, player in enumerate(players):
+            scores = player.get('scores', {})
+            raw[1, i] = scores.get('kills', 0)
+            raw[2, i] = scores.get('deaths', 0)
+            raw[3, i] = scores.get('assists', 0)
+            raw[4, i] = scores.get('wardScore', 0)
+        numeric_features(*raw, out=self._X[:n, :len(NUMERIC_FEATURES)])
+
+        proba = self.forest.predict_proba(self._X[:n])
+        active_id = snapshot.get('activePlayer', {}).get('riotId')
+        own_team = next((player.get('team') for player in players if player.get('riotId') == active_id), 'ORDER')
+        total = 0.0
+        for player, p in zip(players, proba):
+            total += p if player.get('team') == own_team else 1 - p
+        return total / n
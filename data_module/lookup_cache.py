@@ -0,0 +1,124 @@
+# lookup_cache.py
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config.config import LOOKUP_CACHE_PATH, LOOKUP_CACHE_SIZE
+
+NOT_FOUND = object()  # Cached value of a lookup the API answered with a 404
+
+FRESH = 'fresh'
+STALE = 'stale'
+
+
+class LookupCache:
+    """LRU cache of API answers that expire, with an optional shared disk tier.
+
+    Every entry is fresh until its TTL runs out, then stale until its stale
+    deadline: a stale answer may still be served while it is refreshed.
+    A 404 is cached as NOT_FOUND, usually with a short TTL. Up to `maxsize`
+    entries are kept in memory; with a `path`, entries are also written to
+    a SQLite database (WAL mode, a connection per thread, like the match
+    store) that other processes share, and read from it on a memory miss.
+    """
+
+    def __init__(self, maxsize=LOOKUP_CACHE_SIZE, path=LOOKUP_CACHE_PATH):
+        self.maxsize = maxsize
+        self.path = path or None
+        self._entries = collections.OrderedDict()  # key -> (value, fresh_until, stale_until)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS lookups ("
+                    "key TEXT PRIMARY KEY, found INTEGER NOT NULL, value TEXT, "
+                    "fresh_until REAL NOT NULL, stale_until REAL NOT NULL)"
+                )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, key):
+        row = self._connection().execute(
+            "SELECT found, value, fresh_until, stale_until FROM lookups WHERE key = ?", (json.dumps(key),)
+        ).fetchone()
+        if row is None:
+            return None
+        found, value, fresh_until, stale_until = row
+        return (json.loads(value) if found else NOT_FOUND, fresh_until, stale_until)
+
+    def get(self, key):
+        """Return (state, value): state is FRESH, STALE or None (nothing usable cached).
+
+        `value` is NOT_FOUND for a cached 404.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        source = 'memory'
+        if entry is None and self.path:
+            entry = self._read_disk(key)
+            source = 'disk'
+        if entry is None or now >= entry[2]:
+            return None, None
+        if source == 'disk':
+            self._remember(key, entry)
+        return (FRESH if now < entry[1] else STALE), entry[0]
+
+    def put(self, key, value, ttl, stale_ttl=0.0):
+        """Cache an answer (NOT_FOUND for a 404) for `ttl` seconds, then `stale_ttl` more as stale."""
+        now = time.time()
+        entry = (value, now + ttl, now + ttl + stale_ttl)
+        self._remember(key, entry)
+        if self.path:
+            found = value is not NOT_FOUND
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO lookups (key, found, value, fresh_until, stale_until) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (json.dumps(key), int(found), json.dumps(value) if found else None, entry[1], entry[2]),
+                )
+
+    def clear(self):
+        """Drop every entry, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            with self._connection() as conn:
+                conn.execute("DELETE FROM lookups")
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_lookup_cache():
+    """Return the process-wide lookup cache, opening its disk tier on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LookupCache()
+    return _cache
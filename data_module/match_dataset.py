@@ -0,0 +1,174 @@
+# match_dataset.py
+import contextlib
+import glob
+import os
+import sqlite3
+import uuid
+import zlib
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from config.config import DATASET_BUCKETS, DATASET_COMPACT_BYTES, DATASET_COMPACT_FILES
+
+# One row per (match, tracked player)
+SCHEMA = pa.schema([
+    ('matchId', pa.string()),
+    ('puuid', pa.string()),
+    ('gameCreation', pa.int64()),  # Epoch milliseconds
+    ('win', pa.bool_()),
+    ('duration', pa.int32()),  # Seconds
+    ('kills', pa.int16()),
+    ('deaths', pa.int16()),
+    ('assists', pa.int16()),
+    ('championId', pa.int16()),
+    ('role', pa.dictionary(pa.int8(), pa.string())),
+    ('vision_score', pa.int16()),
+    ('patch', pa.dictionary(pa.int8(), pa.string())),  # e.g. "14.20"
+])
+
+# Players' rows are spread over hash buckets: a few dozen partitions, however many players there are
+BUCKET_PARTITIONING = ds.partitioning(pa.schema([('bucket', pa.int16())]), flavor='hive')
+# Day partitions holding every player's rows (the crawler's layout)
+DAY_PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+# Reads every layout, including datasets partitioned by puuid and date before buckets were used
+PARTITIONING = ds.partitioning(
+    pa.schema([('bucket', pa.int16()), ('puuid', pa.string()), ('date', pa.string())]), flavor='hive'
+)
+KEY_INDEX = '_keys.sqlite3'  # Files starting with "_" or "." are not read as part of the dataset
+
+
+def bucket_of(puuid):
+    """The partition a player's rows go to."""
+    return zlib.crc32(puuid.encode()) % DATASET_BUCKETS
+
+def _as_dict(record):
+    # Accept ParticipantRecord tuples as well as plain dicts
+    return record._asdict() if hasattr(record, '_asdict') else record
+
+def _to_table(records, by_player):
+    columns = {field.name: [record.get(field.name) for record in records] for field in SCHEMA}
+    table = pa.Table.from_pydict(columns, schema=SCHEMA)
+    if by_player:
+        return table.append_column('bucket', pa.array([bucket_of(puuid) for puuid in columns['puuid']], pa.int16()))
+    # Partition by the UTC day the game started
+    dates = pc.strftime(pc.cast(table['gameCreation'], pa.timestamp('ms')), format='%Y-%m-%d')
+    return table.append_column('date', dates)
+
+def _dataset(path):
+    # The explicit schema lets files written before a column existed read it as null
+    schema = SCHEMA.append(pa.field('bucket', pa.int16())).append(pa.field('date', pa.string()))
+    return ds.dataset(path, schema=schema, format='parquet', partitioning=PARTITIONING)
+
+def _stored_keys(path):
+    """Every (matchId, puuid) pair in the dataset's files."""
+    try:
+        keys = _dataset(path).to_table(columns=['matchId', 'puuid'])
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return []
+    return zip(keys['matchId'].to_pylist(), keys['puuid'].to_pylist())
+
+def _key_index(path):
+    """Connection to the dataset's index of stored (matchId, puuid) pairs, built from the files on first use."""
+    os.makedirs(path, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(path, KEY_INDEX), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")  # Only one process builds the index
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'match_keys'").fetchone() is None:
+            conn.execute(
+                "CREATE TABLE match_keys (match_id TEXT NOT NULL, puuid TEXT NOT NULL, "
+                "PRIMARY KEY (match_id, puuid)) WITHOUT ROWID"
+            )
+            conn.executemany("INSERT OR IGNORE INTO match_keys VALUES (?, ?)", _stored_keys(path))
+    return conn
+
+def _write(records, path, by_player, basename=None):
+    pq.write_to_dataset(
+        _to_table(records, by_player),
+        path,
+        partitioning=BUCKET_PARTITIONING if by_player else DAY_PARTITIONING,
+        basename_template=f"{basename or f'part-{uuid.uuid4().hex}'}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+def compact(path, buckets=None):
+    """Merge each bucket's small files into one once it has more than DATASET_COMPACT_FILES of them.
+
+    The merged file appears before the small ones are removed, so a reader
+    at that moment may see their rows twice but never misses one. Returns
+    the number of files removed.
+    """
+    if buckets is None:
+        directories = glob.glob(os.path.join(path, 'bucket=*'))
+    else:
+        directories = [os.path.join(path, f'bucket={bucket}') for bucket in buckets]
+    removed = 0
+    for directory in directories:
+        small = [file for file in glob.glob(os.path.join(directory, '*.parquet'))
+                 if os.path.getsize(file) < DATASET_COMPACT_BYTES]
+        if len(small) <= DATASET_COMPACT_FILES:
+            continue
+        table = pa.concat_tables(pq.read_table(file, schema=SCHEMA) for file in small)
+        tmp_path = os.path.join(directory, f'.compact-{uuid.uuid4().hex}.parquet')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(directory, f'part-{uuid.uuid4().hex}-0.parquet'))
+        for file in small:
+            os.remove(file)
+        removed += len(small)
+    return removed
+
+def append_matches(records, path, by_player=True, basename=None):
+    """Append participant rows to the dataset, skipping (matchId, puuid) pairs already stored.
+
+    Rows go into fresh files in their player's hash bucket, so existing
+    files are never rewritten until a bucket's small files are compacted
+    (see compact()). Stored pairs are looked up in an SQLite index kept
+    next to the files rather than read back from them. With by_player=False,
+    rows are grouped by day and nothing is looked up, for callers that
+    already know their rows are new, like the crawler. New files are named
+    `<basename>-<i>.parquet` (a random basename by default); writing the
+    same rows again under the same basename replaces those files. Returns
+    the number of rows written.
+    """
+    records = list({(record['matchId'], record['puuid']): record
+                    for record in map(_as_dict, records)}.values())
+    if not records:
+        return 0
+    if not by_player:
+        _write(records, path, by_player, basename)
+        return len(records)
+
+    with contextlib.closing(_key_index(path)) as conn:
+        with conn:
+            # The new pairs are only committed once their rows are on disk
+            conn.execute("BEGIN IMMEDIATE")
+            new_records = [
+                record for record in records
+                if conn.execute("INSERT OR IGNORE INTO match_keys VALUES (?, ?)",
+                                (record['matchId'], record['puuid'])).rowcount
+            ]
+            if new_records:
+                _write(new_records, path, by_player, basename)
+        if new_records:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")  # One process compacts at a time
+                compact(path, {bucket_of(record['puuid']) for record in new_records})
+    return len(new_records)
+
+def count_matches(path):
+    """Number of rows in the dataset, from the files' metadata."""
+    return _dataset(path).count_rows()
+
+def read_matches(path, columns=None, puuid=None):
+    """Load the dataset as a DataFrame, optionally only some columns or one player."""
+    dataset = _dataset(path)
+    row_filter = None
+    if puuid is not None:
+        # The bucket lets Arrow skip every other bucket's files; older layouts have none
+        in_bucket = (pc.field('bucket') == bucket_of(puuid)) | pc.field('bucket').is_null()
+        row_filter = (pc.field('puuid') == puuid) & in_bucket
+    table = dataset.to_table(columns=columns or SCHEMA.names, filter=row_filter)
+    return table.to_pandas()
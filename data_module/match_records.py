@@ -0,0 +1,81 @@
+# match_records.py
+import json
+from typing import NamedTuple, Optional
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # orjson is optional; the standard parser is just slower
+    loads = json.loads
+
+
+class ParticipantRecord(NamedTuple):
+    """One player's stats from one match.
+
+    A fixed-schema tuple (no per-instance __dict__) that replaces the full
+    match payload as soon as a match is downloaded. pandas builds a
+    DataFrame straight from a list of these.
+    """
+    matchId: str
+    puuid: str
+    gameCreation: int
+    win: bool
+    duration: int
+    kills: int
+    deaths: int
+    assists: int
+    championId: int
+    role: str
+    vision_score: int
+    patch: Optional[str]
+
+
+def _patch(info):
+    return '.'.join(info.get('gameVersion', '').split('.')[:2]) or None
+
+def _record(match_id, info, participant):
+    return ParticipantRecord(
+        matchId=match_id,
+        puuid=participant['puuid'],
+        gameCreation=info['gameCreation'],
+        win=participant['win'],
+        duration=info['gameDuration'],
+        kills=participant['kills'],
+        deaths=participant['deaths'],
+        assists=participant['assists'],
+        championId=participant['championId'],
+        role=participant.get('teamPosition', 'Unknown'),
+        vision_score=participant.get('visionScore', 0),
+        patch=_patch(info),
+    )
+
+def parse_match(raw):
+    """Decode a raw match payload (bytes or str); dicts are passed through."""
+    return raw if isinstance(raw, dict) else loads(raw)
+
+def extract_participant(raw, puuid):
+    """The player's record from a match payload, or None if they didn't play in it."""
+    match_data = parse_match(raw)
+    info = match_data['info']
+    for participant in info['participants']:
+        if participant['puuid'] == puuid:
+            return _record(match_data['metadata']['matchId'], info, participant)
+    return None
+
+def extract_participants(raw, puuids):
+    """Records for every player in `puuids` who played in the match."""
+    match_data = parse_match(raw)
+    info = match_data['info']
+    match_id = match_data['metadata']['matchId']
+    return [
+        _record(match_id, info, participant)
+        for participant in info['participants']
+        if participant['puuid'] in puuids
+    ]
+
+def all_participants(raw):
+    """Records for all ten players in a match."""
+    match_data = parse_match(raw)
+    info = match_data['info']
+    match_id = match_data['metadata']['matchId']
+    return [_record(match_id, info, participant) for participant in info['participants']]
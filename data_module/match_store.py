@@ -0,0 +1,200 @@
+# match_store.py
+import json
+import sqlite3
+import threading
+import zlib
+
+from config.config import MATCH_STORE_PATH
+from data_module.match_records import extract_participants, loads
+
+ROLLUP_COLUMNS = ('games', 'wins', 'kills', 'deaths', 'assists', 'vision_score', 'duration')
+_ROLLUP_KEYS = {'championId': 'champion_id', 'role': 'role', 'patch': 'patch'}
+
+
+class MatchStore:
+    """Persistent store of raw match payloads keyed by match ID.
+
+    Finished matches never change, so a payload is written once and served
+    from disk on every later request. Each thread gets its own SQLite
+    connection and the database runs in WAL mode, so concurrent writers
+    from the match thread pools don't block readers.
+    """
+
+    def __init__(self, path=MATCH_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS matches ("
+                "match_id TEXT PRIMARY KEY, data BLOB NOT NULL)"
+            )
+            # Per-player sync progress: newest list call and oldest game reached
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                "puuid TEXT PRIMARY KEY, last_synced INTEGER, oldest_time INTEGER, "
+                "backfill_done INTEGER NOT NULL DEFAULT 0)"
+            )
+            # Per-player totals by champion, role and patch, and the matches already counted in them
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS champion_rollups ("
+                "puuid TEXT NOT NULL, champion_id INTEGER NOT NULL, role TEXT NOT NULL, patch TEXT NOT NULL, "
+                + ", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in ROLLUP_COLUMNS)
+                + ", PRIMARY KEY (puuid, champion_id, role, patch))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollup_matches ("
+                "puuid TEXT NOT NULL, match_id TEXT NOT NULL, PRIMARY KEY (puuid, match_id))"
+            )
+            # Players synced before the store had rollups; their stored games are counted on first read
+            seeding = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'rollups_pending'").fetchone() is None
+            conn.execute("CREATE TABLE IF NOT EXISTS rollups_pending (puuid TEXT PRIMARY KEY)")
+            if seeding:
+                conn.execute("INSERT OR IGNORE INTO rollups_pending SELECT puuid FROM sync_state")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_raw(self, match_id):
+        """Return the stored match payload as JSON bytes, or None if it was never fetched."""
+        row = self._connection().execute(
+            "SELECT data FROM matches WHERE match_id = ?", (match_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0])
+
+    def get(self, match_id):
+        """Return the stored match payload, or None if it was never fetched."""
+        raw = self.get_raw(match_id)
+        return None if raw is None else loads(raw)
+
+    def put_raw(self, match_id, raw):
+        """Store a match payload given as JSON bytes, as received from the API."""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO matches (match_id, data) VALUES (?, ?)",
+                (match_id, zlib.compress(raw)),
+            )
+
+    def put(self, match_id, match_data):
+        """Store a match payload. Existing entries are left untouched."""
+        self.put_raw(match_id, json.dumps(match_data, separators=(',', ':')).encode())
+
+    def get_sync_state(self, puuid):
+        """Return a player's sync state as a dict, or None if they were never synced."""
+        row = self._connection().execute(
+            "SELECT last_synced, oldest_time, backfill_done FROM sync_state WHERE puuid = ?",
+            (puuid,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {'last_synced': row[0], 'oldest_time': row[1], 'backfill_done': bool(row[2])}
+
+    def update_sync_state(self, puuid, **fields):
+        """Set some of last_synced, oldest_time and backfill_done for a player."""
+        columns = [column for column in ('last_synced', 'oldest_time', 'backfill_done') if column in fields]
+        values = [int(fields[column]) for column in columns]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns)
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT INTO sync_state (puuid, {', '.join(columns)}) "
+                f"VALUES (?{', ?' * len(columns)}) "
+                f"ON CONFLICT(puuid) DO UPDATE SET {updates}",
+                [puuid] + values,
+            )
+
+    def add_to_rollups(self, records):
+        """Count ParticipantRecords into the champion rollups, once per player and match.
+
+        Records whose (puuid, matchId) was counted before are skipped, so
+        ingesting the same match twice changes nothing. Returns how many
+        records were counted.
+        """
+        counted = 0
+        with self._connection() as conn:
+            for record in records:
+                if conn.execute(
+                    "INSERT OR IGNORE INTO rollup_matches (puuid, match_id) VALUES (?, ?)",
+                    (record.puuid, record.matchId),
+                ).rowcount == 0:
+                    continue
+                conn.execute(
+                    f"INSERT INTO champion_rollups (puuid, champion_id, role, patch, {', '.join(ROLLUP_COLUMNS)}) "
+                    f"VALUES (?, ?, ?, ?{', ?' * len(ROLLUP_COLUMNS)}) "
+                    "ON CONFLICT(puuid, champion_id, role, patch) DO UPDATE SET "
+                    + ", ".join(f"{column} = {column} + excluded.{column}" for column in ROLLUP_COLUMNS),
+                    (record.puuid, record.championId, record.role or '', record.patch or '', 1, int(record.win),
+                     record.kills, record.deaths, record.assists, record.vision_score, record.duration),
+                )
+                counted += 1
+        return counted
+
+    def _seed_rollups(self):
+        """Count the stored games of every player still waiting for it, in one pass over the store."""
+        conn = self._connection()
+        pending = {row[0] for row in conn.execute("SELECT puuid FROM rollups_pending")}
+        if not pending:
+            return
+        needles = [puuid.encode() for puuid in pending]
+        records = []
+        for (data,) in conn.execute("SELECT data FROM matches"):
+            raw = zlib.decompress(data)
+            if any(needle in raw for needle in needles):  # Most matches have none of them; skip parsing those
+                records.extend(extract_participants(raw, pending))
+        self.add_to_rollups(records)
+        with conn:
+            conn.executemany("DELETE FROM rollups_pending WHERE puuid = ?", [(puuid,) for puuid in pending])
+
+    def rollup_totals(self, puuid, by=('championId',), champion_ids=None):
+        """A player's rollup totals grouped by any of championId, role and patch.
+
+        Returns {group: {games, wins, kills, ...}}, where group is a single
+        value for one key and a tuple otherwise. Reads one row per champion,
+        role and patch the player has games on, however many matches that is.
+        For a player synced before the store had rollups, the matches already
+        stored are counted in first.
+        """
+        if self._connection().execute("SELECT 1 FROM rollups_pending WHERE puuid = ?", (puuid,)).fetchone():
+            self._seed_rollups()
+        keys = [_ROLLUP_KEYS[name] for name in by]
+        sql = (
+            f"SELECT {', '.join(keys)}, {', '.join(f'SUM({column})' for column in ROLLUP_COLUMNS)} "
+            "FROM champion_rollups WHERE puuid = ?"
+        )
+        params = [puuid]
+        if champion_ids is not None:
+            champion_ids = list(champion_ids)
+            sql += f" AND champion_id IN ({', '.join('?' * len(champion_ids))})"
+            params += champion_ids
+        sql += f" GROUP BY {', '.join(keys)}"
+
+        totals = {}
+        for row in self._connection().execute(sql, params):
+            group = tuple(None if value == '' else value for value in row[:len(keys)])
+            totals[group[0] if len(keys) == 1 else group] = dict(zip(ROLLUP_COLUMNS, row[len(keys):]))
+        return totals
+
+    def __contains__(self, match_id):
+        row = self._connection().execute(
+            "SELECT 1 FROM matches WHERE match_id = ?", (match_id,)
+        ).fetchone()
+        return row is not None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_match_store():
+    """Return the process-wide match store, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MatchStore()
+    return _store
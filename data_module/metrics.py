@@ -0,0 +1,280 @@
+# metrics.py
+import bisect
+import collections
+import contextlib
+import cProfile
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+
+from config.config import LOG_FORMAT, PROFILE_DIR
+
+# Histogram bucket upper bounds in seconds, from a fast cache hit to a long Retry-After
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_EVENTS = 200  # Events kept for the JSON snapshot
+
+# Riot API paths reduced to templates, so IDs don't become label values
+_ENDPOINTS = [
+    (re.compile(pattern), name) for pattern, name in (
+        (r'^/riot/account/v1/accounts/by-riot-id/', 'account.by_riot_id'),
+        (r'^/lol/summoner/v4/summoners/by-puuid/', 'summoner.by_puuid'),
+        (r'^/lol/spectator/v\d+/active-games/', 'spectator.active_game'),
+        (r'^/lol/champion-mastery/v4/champion-masteries/by-puuid/', 'mastery.by_puuid'),
+        (r'^/lol/match/v5/matches/by-puuid/[^/]+/ids$', 'match.ids_by_puuid'),
+        (r'^/lol/match/v5/matches/[^/]+/timeline$', 'match.timeline'),
+        (r'^/lol/match/v5/matches/[^/]+$', 'match.by_id'),
+        (r'^/api/versions\.json$', 'ddragon.versions'),
+        (r'^/cdn/[^/]+/data/[^/]+/champion\.json$', 'ddragon.champions'),
+        (r'^/liveclientdata/', 'live_client'),
+    )
+]
+
+
+def endpoint_name(path):
+    """A low-cardinality name for an API path, e.g. 'match.by_id'."""
+    for pattern, name in _ENDPOINTS:
+        if pattern.search(path):
+            return name
+    return 'other'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style, with a sum and count."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _prometheus_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Metrics:
+    """Counters, gauges and histograms keyed by metric name and labels.
+
+    Cheap enough for the request hot path: one lock and a dict lookup per
+    update. Exposed as Prometheus text (`prometheus`) or a JSON-ready dict
+    (`snapshot`), which also carries the most recent structured events.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self.events = collections.deque(maxlen=RECENT_EVENTS)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def add_gauge(self, name, amount, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def counter(self, name, **labels):
+        """Current value of a counter (0 if it was never incremented)."""
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.events.clear()
+
+    def snapshot(self):
+        """Every metric and the recent events as plain, JSON-serializable data."""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(key), 'value': value}
+                        for (name, key), value in sorted(self._counters.items())]
+            gauges = [{'name': name, 'labels': dict(key), 'value': value}
+                      for (name, key), value in sorted(self._gauges.items())]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(key),
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99),
+                    'buckets': dict(zip([str(b) for b in histogram.buckets] + ['+Inf'], histogram.counts)),
+                }
+                for (name, key), histogram in sorted(self._histograms.items())
+            ]
+            events = list(self.events)
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms, 'events': events}
+
+    def prometheus(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for kind, values in (('counter', self._counters), ('gauge', self._gauges)):
+                last = None
+                for (name, key), value in sorted(values.items()):
+                    if name != last:
+                        lines.append(f'# TYPE {name} {kind}')
+                        last = name
+                    lines.append(f'{name}{_prometheus_labels(key)} {value}')
+            last = None
+            for (name, key), histogram in sorted(self._histograms.items()):
+                if name != last:
+                    lines.append(f'# TYPE {name} histogram')
+                    last = name
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (math.inf,), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == math.inf else repr(bound)
+                    lines.append(f'{name}_bucket{_prometheus_labels(key, [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{_prometheus_labels(key)} {histogram.sum}')
+                lines.append(f'{name}_count{_prometheus_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+_metrics = Metrics()
+
+def get_metrics():
+    """Return the process-wide metrics registry."""
+    return _metrics
+
+def write_metrics(path):
+    """Write a metrics snapshot: JSON if path ends in .json, Prometheus text otherwise."""
+    with open(path, 'w') as f:
+        if path.endswith('.json'):
+            json.dump(_metrics.snapshot(), f, indent=2, default=str)
+        else:
+            f.write(_metrics.prometheus())
+
+
+class _EventFormatter(logging.Formatter):
+    # Text shows just the message, as the old prints did; json gives one object per line
+    def format(self, record):
+        if LOG_FORMAT != 'json':
+            return record.getMessage()
+        return json.dumps({
+            'time': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'event': getattr(record, 'event', None),
+            'message': record.getMessage(),
+            **getattr(record, 'fields', {}),
+        }, default=str)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    # Looks sys.stdout up on every write, like print, so redirect_stdout still works
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def _event_logger():
+    logger = logging.getLogger('lana')
+    if not logger.handlers:
+        handler = _StdoutHandler()
+        handler.setFormatter(_EventFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+def event(name, message, level='info', **fields):
+    """Report something that happened, as a structured event.
+
+    The message is shown on the console (or a JSON line with LOG_FORMAT=json),
+    the event is counted in lana_events_total and kept for the JSON
+    snapshot along with its fields.
+    """
+    _metrics.inc('lana_events_total', event=name, level=level)
+    _metrics.events.append({'time': time.time(), 'event': name, 'level': level, 'message': message, **fields})
+    _event_logger().log(logging.getLevelName(level.upper()), message, extra={'event': name, 'fields': fields})
+
+
+_stage_hooks = []
+_profiling = threading.local()
+
+def add_stage_hook(hook):
+    """Call hook(stage_name, seconds) whenever a pipeline stage finishes."""
+    _stage_hooks.append(hook)
+
+def remove_stage_hook(hook):
+    _stage_hooks.remove(hook)
+
+@contextlib.contextmanager
+def stage(name):
+    """Time a pipeline stage into lana_stage_seconds.
+
+    With PROFILE_DIR set, the outermost stage in each thread also runs under
+    cProfile and its stats are written to PROFILE_DIR/<stage>-<time>.prof
+    (load them with pstats or snakeviz).
+    """
+    profiler = None
+    if PROFILE_DIR and not getattr(_profiling, 'active', False):
+        profiler = cProfile.Profile()
+        _profiling.active = True
+        profiler.enable()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if profiler is not None:
+            profiler.disable()
+            _profiling.active = False
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f'{name}-{time.time_ns()}.prof'))
+        _metrics.observe('lana_stage_seconds', elapsed, stage=name)
+        for hook in list(_stage_hooks):
+            hook(name, elapsed)
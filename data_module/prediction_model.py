@@ -1,51 +1,164 @@
+# prediction_model.py
+import argparse
+import glob
+import hashlib
 import json
+import os
+import time
+
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from riotwatcher import LolWatcher
-from config import API_KEY
-from champion_mapping import champion_mapping  # Import the champion_mapping
+import scipy.sparse as sp
+
+from config.config import MATCH_DATASET_PATH, MODEL_DIR, RETRAIN_MIN_NEW_MATCHES, MODEL_MAX_DEPTH
+from data_module.data_processing import count_data, load_data
+from data_module.features import FeatureBuilder
+from data_module.metrics import event
+
+# joblib and scikit-learn take about a second to import, so they are only
+# imported when a model is trained or loaded
+
+# Bump when the feature builder changes, so cached matrices and models are rebuilt
+FEATURE_VERSION = 2
+MODEL_INFO_FILE = os.path.join(MODEL_DIR, 'model.json')
+
+feature_builder = FeatureBuilder()
+
+def build_features(df):
+    """Turn match rows into the model's sparse feature matrix X and target y."""
+    X = feature_builder.transform(df)
+    y = df['win'].to_numpy(dtype=np.int8)  # Target variable
+    return X, y
+
+def snapshot_version(df):
+    """Short tag identifying a data snapshot and the feature code that reads it."""
+    if {'matchId', 'puuid'}.issubset(df.columns):
+        keys = df['matchId'].astype(str) + ':' + df['puuid'].astype(str)
+        digest = pd.util.hash_pandas_object(keys.sort_values(), index=False).values
+    else:
+        digest = pd.util.hash_pandas_object(df, index=False).values
+    return hashlib.sha1(digest.tobytes() + str(FEATURE_VERSION).encode()).hexdigest()[:12]
+
+def load_feature_matrix(df, version):
+    """Build X and y for a snapshot, reusing the cached matrix if it was built before."""
+    features_path = os.path.join(MODEL_DIR, f'features-{version}.npz')
+    labels_path = os.path.join(MODEL_DIR, f'labels-{version}.npy')
+    if os.path.exists(features_path) and os.path.exists(labels_path):
+        return sp.load_npz(features_path), np.load(labels_path)
+
+    X, y = build_features(df)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    sp.save_npz(features_path, X)
+    np.save(labels_path, y)
+    return X, y
+
+def load_model_info():
+    """Metadata of the saved model (version, rows, path, ...), or None."""
+    try:
+        with open(MODEL_INFO_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _prune_artifacts(keep):
+    """Delete models and cached feature matrices whose version isn't in `keep`."""
+    for pattern in ('win_model-*.joblib', 'features-*.npz', 'labels-*.npy'):
+        for path in glob.glob(os.path.join(MODEL_DIR, pattern)):
+            version = os.path.basename(path).split('-', 1)[1].split('.', 1)[0]
+            if version not in keep:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+def train_model(data_path=MATCH_DATASET_PATH, force=False, min_new_matches=RETRAIN_MIN_NEW_MATCHES):
+    """Train and save the win-prediction model if enough new matches have arrived.
+
+    The model is saved under a version tag derived from the data snapshot.
+    Returns the saved model's metadata, which is the existing model's when
+    retraining was skipped. The data is only loaded once retraining is due.
+    """
+    info = load_model_info()
+    if not force and info is not None:
+        new_rows = count_data(data_path) - info['rows']
+        if new_rows < min_new_matches:
+            event('training_skipped', f"Skipping training: {new_rows} new rows since model {info['version']}.",
+                  new_rows=new_rows, version=info['version'])
+            return info
+
+    previous = info
+    df = load_data(data_path)
 
-watcher = LolWatcher(API_KEY)
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
 
-# Load the match history data from a CSV file
-df = pd.read_csv('match_history.csv')
+    version = snapshot_version(df)
+    X, y = load_feature_matrix(df, version)
 
-# Function to map champion IDs to names
-def map_champions(row):
-    champ_id = row['championId']
-    return champion_mapping.get(champ_id, "Unknown")
+    # Split the data into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# Apply the mapping function to add a champion name column
-df['championName'] = df.apply(map_champions, axis=1)
+    # Train on every core; bounded depth keeps live per-tick scoring cheap
+    model = RandomForestClassifier(
+        n_estimators=200, max_depth=MODEL_MAX_DEPTH, min_samples_leaf=2, n_jobs=-1, random_state=42
+    )
+    model.fit(X_train, y_train)
+    accuracy = float(model.score(X_test, y_test)) if X_test.shape[0] else None
 
-# Select relevant columns
-df = df[['win', 'duration', 'kills', 'deaths', 'assists', 'championId', 'championName', 'role', 'vision_score']]
+    model_path = os.path.join(MODEL_DIR, f'win_model-{version}.joblib')
+    joblib.dump({'model': model, 'builder': feature_builder, 'version': version}, model_path)
+    info = {
+        'version': version,
+        'rows': len(df),
+        'accuracy': accuracy,
+        'path': model_path,
+        'trained_at': time.time(),
+    }
+    tmp_path = f'{MODEL_INFO_FILE}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(info, f)
+    os.replace(tmp_path, MODEL_INFO_FILE)
+    # The replaced model stays, for a reader that looked it up just before
+    _prune_artifacts({version, previous['version']} if previous else {version})
 
-# Create dummy variables for roles
-roles = ['TOP', 'JUNGLE', 'MID', 'BOTTOM', 'SUPPORT']
-for role in roles:
-    df[f'role_{role}'] = (df['role'] == role).astype(int)
+    global _loaded
+    _loaded = None  # The next prediction picks up the new model
+    return info
 
-# Drop the original role column
-df.drop(columns=['role'], inplace=True)
 
-# Show the updated DataFrame
-print(df)
+_loaded = None
 
-# Prepare data for model training
-X = df.drop(columns=['win', 'championId', 'championName'])  # Features
-y = df['win']  # Target variable
+def load_model():
+    """Load the saved model once and keep it for later predictions."""
+    global _loaded
+    if _loaded is None:
+        info = load_model_info()
+        if info is None:
+            raise FileNotFoundError(f"No trained model in {MODEL_DIR}; run train_model() first.")
+        import joblib
 
-# Split the data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        _loaded = joblib.load(info['path'])
+    return _loaded
 
-# Initialize and train the Random Forest model
-model = RandomForestClassifier()
-model.fit(X_train, y_train)
+def predict(rows):
+    """Win probability for each match row (list of records/dicts or a DataFrame)."""
+    saved = load_model()
+    model = saved['model']
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    X = saved['builder'].transform(df)
+    classes = list(model.classes_)
+    if 1 not in classes:  # Trained on losses only, e.g. from one player's rows
+        return np.zeros(X.shape[0])
+    return model.predict_proba(X)[:, classes.index(1)]
 
-# Make predictions
-predictions = model.predict(X_test)
+def main(argv=None):
+    # Train from the given dataset or CSV, e.g. `python -m data_module.prediction_model match_history.csv`
+    parser = argparse.ArgumentParser(description="Train the win-prediction model.")
+    parser.add_argument('path', nargs='?', default=MATCH_DATASET_PATH, help="match dataset directory or CSV file")
+    parser.add_argument('--force', action='store_true', help="retrain even if few new matches were added")
+    args = parser.parse_args(argv)
+    print(train_model(args.path, force=args.force))
 
-# Optionally, print predictions
-print(predictions)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# service.py
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from config.config import MATCH_DATASET_PATH, SERVICE_HOST, SERVICE_PORT, SERVICE_REQUEST_TIMEOUT
+from data_module.champion_data import get_champion_name_map
+from data_module.data_collecter import get_champion_stats, retrieve_match_data
+from data_module.data_processing import calculate_metrics, load_data, save_data
+from data_module.fetch_engine import DeadlineExceeded, get_fetch_engine, request_class
+from data_module.http_client import connection_stats, ddragon_client, riot_client
+from data_module.lookup_cache import get_lookup_cache
+from data_module.match_store import get_match_store
+from data_module.metrics import event, get_metrics
+
+_routes = {}
+_save_lock = threading.Lock()  # Appends and the read-back that follows run one at a time
+_started_at = time.time()
+
+
+class BadRequest(Exception):
+    """A request the client has to fix; answered with a 400."""
+
+
+def route(method, path):
+    """Register handler(query, payload) -> (status, body) for a method and path."""
+    def register(handler):
+        _routes[(method, path)] = handler
+        return handler
+    return register
+
+def _required(query, *names):
+    missing = [name for name in names if not query.get(name)]
+    if missing:
+        raise BadRequest(f"Missing query parameter(s): {', '.join(missing)}")
+    return [query[name] for name in names]
+
+def _flag(query, name, default=False):
+    if name not in query:
+        return default
+    return query[name].lower() in ('1', 'true', 'yes')
+
+
+@route('GET', '/health')
+def health(query, payload):
+    return 200, {'status': 'ok', 'uptime': round(time.time() - _started_at, 1), 'connections': connection_stats()}
+
+@route('GET', '/metrics')
+def metrics_text(query, payload):
+    return 200, get_metrics().prometheus()
+
+@route('GET', '/metrics.json')
+def metrics_json(query, payload):
+    return 200, get_metrics().snapshot()
+
+@route('GET', '/champion-stats')
+def champion_stats(query, payload):
+    """The "Champion Mastery" flow: top mastery champions with win rates (rollups=1 for all synced games)."""
+    game_name, tag_line = _required(query, 'game_name', 'tag_line')
+    stats = get_champion_stats(game_name, tag_line, query.get('region', 'na1'),
+                               single_pass=_flag(query, 'single_pass', default=True),
+                               from_rollups=_flag(query, 'rollups'))
+    if stats is None:
+        return 404, {'error': f"No champion statistics available for {game_name}#{tag_line}"}
+    return 200, stats
+
+@route('GET', '/live-data')
+def live_data(query, payload):
+    """The "Live Data" flow: recent matches saved to the dataset, with the player's win rate."""
+    game_name, tag_line = _required(query, 'game_name', 'tag_line')
+    try:
+        count = int(query.get('count', 20))
+    except ValueError:
+        raise BadRequest("count must be an integer")
+    if count <= 0:
+        raise BadRequest("count must be positive")
+
+    match_data = retrieve_match_data(game_name, tag_line, count, incremental=_flag(query, 'incremental'))
+    if match_data is None:
+        return 404, {'error': f"No match data retrieved for {game_name}#{tag_line}"}
+    body = {'matches': [row._asdict() for row in match_data]}
+    if match_data:
+        with _save_lock:
+            save_data(match_data, MATCH_DATASET_PATH)
+            loaded_data = load_data(MATCH_DATASET_PATH, columns=['win', 'duration'], puuid=match_data[0].puuid)
+        win_rate, average_duration = calculate_metrics(loaded_data)
+        body.update(win_rate=float(win_rate), average_duration=float(average_duration))
+    return 200, body
+
+@route('POST', '/predict')
+def predict_rows(query, payload):
+    """Win probability for match rows posted as {"rows": [...]}."""
+    from data_module.prediction_model import predict
+
+    if not isinstance(payload, dict) or not isinstance(payload.get('rows'), list):
+        raise BadRequest('Expected a JSON body like {"rows": [...]}')
+    try:
+        return 200, {'win_probability': [float(p) for p in predict(payload['rows'])]}
+    except FileNotFoundError as err:
+        return 503, {'error': str(err)}
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so frontends can reuse connections
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        handler = _routes.get((method, url.path))
+        try:
+            # Only a malformed request is the client's fault; a ValueError from a handler is a 500
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                raw_body = self.rfile.read(length) if length else b''
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                payload = json.loads(raw_body) if raw_body else None
+            except ValueError as err:
+                raise BadRequest(f"Malformed request: {err}")
+            if handler is None:
+                status, body = 404, {'error': f"No route for {method} {url.path}"}
+            else:
+                # Interactive calls go ahead of backfill, and clients share the tokens fairly
+                tenant = self.headers.get('X-Tenant') or self.client_address[0]
+                with request_class('interactive', tenant=tenant, timeout=SERVICE_REQUEST_TIMEOUT):
+                    status, body = handler(query, payload)
+        except BadRequest as err:
+            status, body = 400, {'error': str(err)}
+        except DeadlineExceeded as err:
+            status, body = 504, {'error': str(err)}
+        except Exception as err:
+            event('service_error', f"Error handling {method} {url.path}: {err}", level='error',
+                  path=url.path, error=str(err))
+            status, body = 500, {'error': str(err)}
+
+        if isinstance(body, str):
+            data, content_type = body.encode(), 'text/plain; version=0.0.4'
+        else:
+            data, content_type = json.dumps(body, default=str).encode(), 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+        route_name = url.path if handler is not None else 'unknown'
+        metrics = get_metrics()
+        metrics.inc('lana_service_requests_total', route=route_name, status=status)
+        metrics.observe('lana_service_request_seconds', time.perf_counter() - started, route=route_name)
+
+    def log_message(self, format, *args):
+        pass  # Requests are counted in the metrics instead
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('unix', 0)  # BaseHTTPRequestHandler expects a (host, port) address
+
+
+def warm_up():
+    """Load everything a request would otherwise load on first use."""
+    get_fetch_engine()
+    get_match_store()
+    get_lookup_cache()
+    riot_client()
+    ddragon_client()
+    get_champion_name_map()
+    try:
+        from data_module.prediction_model import load_model
+        load_model()
+    except FileNotFoundError:
+        pass  # /predict answers 503 until a model is trained
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, socket_path=None):
+    """Serve the analytics API until interrupted, over TCP or a Unix socket.
+
+    Routes: GET /champion-stats and /live-data (game_name, tag_line, ...),
+    POST /predict, GET /health, /metrics (Prometheus) and /metrics.json.
+    Each request runs in its own thread over the shared, already-warm
+    fetch engine, HTTP sessions, champion map, lookup cache, match store
+    and model.
+    """
+    warm_up()
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, ServiceHandler)
+        address = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+        server.daemon_threads = True
+        address = f"http://{host}:{server.server_port}"
+    event('service_started', f"Serving on {address}", address=address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,202 @@
+# spectator_monitor.py
+import concurrent.futures
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from config.config import (
+    MATCH_DATASET_PATH, MONITOR_ACTIVE_INTERVAL, MONITOR_ACTIVE_WINDOW, MONITOR_BUDGET_SHARE,
+    MONITOR_IDLE_MAX_INTERVAL, MONITOR_IN_GAME_INTERVAL, MONITOR_INGEST_DELAY, FETCH_CONCURRENCY,
+)
+from data_module.batch_collecter import resolve_puuids
+from data_module.data_collecter import get_summoner_id_by_puuid, sync_match_history
+from data_module.fetch_engine import carry_request_class, get_fetch_engine, request_class
+from data_module.http_client import RiotAPIError, riot_get
+from data_module.metrics import endpoint_name, event, get_metrics
+
+INGEST_ATTEMPTS = 5  # Syncs tried before giving up on a finished game's match
+
+
+class WatchedPlayer:
+    """Polling state for one player on the watchlist."""
+
+    __slots__ = ('riot_id', 'puuid', 'summoner_id', 'game', 'interval', 'last_active')
+
+    def __init__(self, riot_id, puuid, summoner_id):
+        self.riot_id = riot_id
+        self.puuid = puuid
+        self.summoner_id = summoner_id
+        self.game = None  # Spectator payload of the game they're in
+        self.interval = MONITOR_ACTIVE_INTERVAL
+        self.last_active = None  # time.time() they were last seen in a game
+
+    @property
+    def name(self):
+        return '#'.join(self.riot_id)
+
+
+class SpectatorMonitor:
+    """Watches many players' spectator status and reports games starting and ending.
+
+    Each player has their own poll interval. Players in a game are polled
+    every MONITOR_IN_GAME_INTERVAL seconds to catch the end; players whose
+    last game ended within MONITOR_ACTIVE_WINDOW are likely queueing again
+    and are polled every MONITOR_ACTIVE_INTERVAL; everyone else backs off,
+    doubling their interval up to MONITOR_IDLE_MAX_INTERVAL. Polls are due
+    from a heap, go through the shared fetch engine as live requests under
+    a budget of `budget_share` of the rate limits, and at most `concurrency` are in
+    flight, so a large watchlist slows polling down instead of crowding
+    out other requests.
+
+    Emits game_started and game_ended events. When a game ends, the
+    player's match history is synced after MONITOR_INGEST_DELAY (retried
+    until the match shows up) and the new rows are appended to the match
+    dataset.
+    """
+
+    def __init__(self, platform='na1', region='americas', budget_share=MONITOR_BUDGET_SHARE,
+                 concurrency=FETCH_CONCURRENCY, dataset_path=MATCH_DATASET_PATH, ingest=True):
+        self.platform = platform
+        self.region = region
+        self.concurrency = concurrency
+        self.dataset_path = dataset_path
+        self.ingest = ingest
+        self.players = {}
+        self._budget = get_fetch_engine().budget(budget_share)
+        self._due = []  # (due time.monotonic(), sequence, puuid)
+        self._in_game = 0
+        self._sequence = itertools.count()
+        self._ingests = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='monitor-ingest')
+        self._save_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _schedule(self, player, delay):
+        heapq.heappush(self._due, (time.monotonic() + delay, next(self._sequence), player.puuid))
+
+    def watch(self, riot_ids):
+        """Add players by Riot ID; returns how many could be resolved and are now watched."""
+        with request_class('live', tenant='monitor'):
+            puuids = {riot_id: puuid for riot_id, puuid in resolve_puuids(riot_ids).items()
+                      if puuid not in self.players}
+            lookup = carry_request_class(lambda puuid: get_summoner_id_by_puuid(puuid, self.platform))
+        added = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            summoner_ids = executor.map(lookup, puuids.values())
+            for (riot_id, puuid), summoner_id in zip(puuids.items(), summoner_ids):
+                if summoner_id is None:
+                    continue
+                player = self.players[puuid] = WatchedPlayer(riot_id, puuid, summoner_id)
+                added += 1
+                # Spread the first round of polls out instead of sending them all at once
+                self._schedule(player, random.uniform(0, MONITOR_ACTIVE_INTERVAL))
+        get_metrics().set_gauge('lana_monitor_players', len(self.players))
+        return added
+
+    def _poll(self, player):
+        path = f"/lol/spectator/v4/active-games/by-summoner/{player.summoner_id}"
+        key = (endpoint_name(path), self.platform, path, ())
+        # Straight to the API, not the lookup cache: a cached "not in game" would hide a game starting
+        return get_fetch_engine().submit(self.platform, riot_get, path, key=key, budget=self._budget)
+
+    def _next_interval(self, player, now):
+        if player.game is not None:
+            return MONITOR_IN_GAME_INTERVAL
+        if player.last_active is not None and now - player.last_active < MONITOR_ACTIVE_WINDOW:
+            return MONITOR_ACTIVE_INTERVAL
+        return min(max(player.interval, MONITOR_ACTIVE_INTERVAL) * 2, MONITOR_IDLE_MAX_INTERVAL)
+
+    def _update(self, player, game):
+        """Apply one poll result (the spectator payload, or None when not in a game)."""
+        now = time.time()
+        previous = player.game
+        if game is not None:
+            player.last_active = now
+        if previous is not None and (game is None or game['gameId'] != previous['gameId']):
+            self._game_ended(player, previous)
+        if game is not None and (previous is None or game['gameId'] != previous['gameId']):
+            champion_id = next((participant['championId'] for participant in game.get('participants', [])
+                                if participant.get('puuid') == player.puuid), None)
+            event('game_started', f"{player.name} started a game ({game['platformId']}_{game['gameId']}).",
+                  puuid=player.puuid, game_id=game['gameId'], queue=game.get('gameQueueConfigId'),
+                  champion_id=champion_id)
+        self._in_game += (game is not None) - (previous is not None)
+        player.game = game
+        player.interval = self._next_interval(player, now)
+        self._schedule(player, player.interval)
+
+    def _game_ended(self, player, game):
+        match_id = f"{game['platformId']}_{game['gameId']}"
+        event('game_ended', f"{player.name}'s game {match_id} ended.", puuid=player.puuid, match_id=match_id)
+        get_metrics().inc('lana_monitor_games_total')
+        if self.ingest:
+            self._ingest_later(player, match_id, MONITOR_INGEST_DELAY, INGEST_ATTEMPTS)
+
+    def _ingest_later(self, player, match_id, delay, attempts):
+        timer = threading.Timer(delay, lambda: self._ingests.submit(self._ingest, player, match_id, attempts))
+        timer.daemon = True
+        timer.start()
+
+    def _ingest(self, player, match_id, attempts):
+        from data_module.match_dataset import append_matches
+
+        try:
+            with request_class('live', tenant='monitor'):
+                rows = sync_match_history(self.region, player.puuid) or []
+            if rows:
+                with self._save_lock:
+                    append_matches(rows, self.dataset_path)
+        except Exception as err:
+            # Runs in a pool nobody waits on, so an error has to be reported here
+            event('ingest_error', f"Failed to ingest {match_id} for {player.name}: {err}", level='error',
+                  puuid=player.puuid, match_id=match_id, error=str(err))
+            rows = []
+        if any(row.matchId == match_id for row in rows):
+            event('game_ingested', f"Ingested {match_id} for {player.name} ({len(rows)} rows).", puuid=player.puuid,
+                  match_id=match_id, rows=len(rows))
+        elif attempts > 1:
+            self._ingest_later(player, match_id, MONITOR_INGEST_DELAY, attempts - 1)  # Not published yet
+        else:
+            event('game_not_ingested', f"Match {match_id} was not available for {player.name}.", level='warning',
+                  puuid=player.puuid, match_id=match_id, rows=len(rows))
+
+    def run(self, duration=None):
+        """Poll until stop() is called (or for `duration` seconds)."""
+        metrics = get_metrics()
+        deadline = None if duration is None else time.monotonic() + duration
+        in_flight = {}
+        with request_class('live', tenant='monitor'):
+            while not self._stop.is_set() and (deadline is None or time.monotonic() < deadline):
+                now = time.monotonic()
+                while self._due and self._due[0][0] <= now and len(in_flight) < self.concurrency:
+                    due, _, puuid = heapq.heappop(self._due)
+                    metrics.observe('lana_monitor_poll_lag_seconds', now - due)
+                    in_flight[self._poll(self.players[puuid])] = self.players[puuid]
+
+                timeout = max(0.0, self._due[0][0] - now) if self._due else 1.0
+                if deadline is not None:
+                    timeout = min(timeout, max(0.0, deadline - now))
+                if not in_flight:
+                    self._stop.wait(min(timeout, 1.0))
+                    continue
+                done, _ = concurrent.futures.wait(in_flight, timeout=min(timeout, 1.0),
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    player = in_flight.pop(future)
+                    try:
+                        game = future.result()
+                    except RiotAPIError as err:
+                        if err.kind != 'not_found':
+                            event('monitor_error', f"Spectator check failed for {player.name}: {err}",
+                                  level='warning', puuid=player.puuid, error=str(err))
+                            self._schedule(player, player.interval)  # Keep the state; try again later
+                            continue
+                        game = None  # Not in a game
+                    self._update(player, game)
+                metrics.set_gauge('lana_monitor_in_game', self._in_game)
+        for future in in_flight:
+            future.cancel()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,159 @@
+# timeline_store.py
+import os
+import threading
+
+import numpy as np
+
+from config.config import TIMELINE_MAX_MINUTES, TIMELINE_STORE_PATH
+from data_module.match_records import loads
+
+# Values kept for each participant and minute, in array order
+TIMELINE_FIELDS = ('gold', 'xp', 'cs', 'x', 'y')
+GOLD, XP, CS, X, Y = range(len(TIMELINE_FIELDS))
+PARTICIPANTS = 10
+INITIAL_CAPACITY = 1024  # Matches the files have room for before they first grow
+
+
+def parse_timeline(raw, max_minutes=TIMELINE_MAX_MINUTES):
+    """Turn a timeline payload (JSON bytes or dict) into (puuids, frames, minutes).
+
+    frames is an int32 array of shape (10, max_minutes, len(TIMELINE_FIELDS))
+    holding one frame per minute; minutes is how many frames the game had.
+    Minutes after the game ended repeat its last frame, so curves from
+    games of different lengths can be compared directly.
+    """
+    timeline = loads(raw) if isinstance(raw, (bytes, bytearray, memoryview, str)) else raw
+    info = timeline['info']
+    puuids = timeline['metadata']['participants']
+    frames = np.zeros((PARTICIPANTS, max_minutes, len(TIMELINE_FIELDS)), dtype=np.int32)
+    minutes = min(len(info['frames']), max_minutes)
+    for minute, frame in enumerate(info['frames'][:minutes]):
+        for participant_id, stats in frame['participantFrames'].items():
+            position = stats.get('position', {})
+            frames[int(participant_id) - 1, minute] = (
+                stats.get('totalGold', 0),
+                stats.get('xp', 0),
+                stats.get('minionsKilled', 0) + stats.get('jungleMinionsKilled', 0),
+                position.get('x', 0),
+                position.get('y', 0),
+            )
+    if 0 < minutes < max_minutes:
+        frames[:, minutes:] = frames[:, minutes - 1:minutes]
+    return puuids, frames, minutes
+
+
+class TimelineStore:
+    """Per-minute participant frames for many matches in memory-mapped arrays.
+
+    Each match takes one fixed-width row of `frames.i32`, shaped
+    (10 participants, max_minutes, fields), with its frame count in
+    `minutes.i16`. `index.tsv` maps match IDs to rows (and lists each
+    match's participants), so reading a match is a dict lookup and a view
+    into the mapped file: nothing is parsed or copied. A row is written
+    before its index line, so an interrupted write never shows up.
+    """
+
+    def __init__(self, path=TIMELINE_STORE_PATH, max_minutes=TIMELINE_MAX_MINUTES):
+        self.path = path
+        self.max_minutes = max_minutes
+        self._row_shape = (PARTICIPANTS, max_minutes, len(TIMELINE_FIELDS))
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._participants = []
+        os.makedirs(path, exist_ok=True)
+
+        index_path = os.path.join(path, 'index.tsv')
+        if os.path.exists(index_path):
+            with open(index_path, encoding='utf-8') as f:
+                for line in f:
+                    match_id, puuids = line.rstrip('\n').split('\t')
+                    self._rows[match_id] = len(self._participants)
+                    self._participants.append(puuids.split(','))
+        self._index = open(index_path, 'a', encoding='utf-8')
+        self._open(max(INITIAL_CAPACITY, len(self._participants)))
+
+    def _open(self, capacity):
+        # Map the data files with room for `capacity` matches, growing them if needed
+        self.capacity = capacity
+        row_size = int(np.prod(self._row_shape))
+        for name, itemsize in (('frames.i32', 4 * row_size), ('minutes.i16', 2)):
+            file_path = os.path.join(self.path, name)
+            with open(file_path, 'ab') as f:
+                if f.tell() < capacity * itemsize:
+                    f.truncate(capacity * itemsize)
+        self._frames = np.memmap(os.path.join(self.path, 'frames.i32'), dtype=np.int32,
+                                 mode='r+', shape=(capacity,) + self._row_shape)
+        self._minutes = np.memmap(os.path.join(self.path, 'minutes.i16'), dtype=np.int16,
+                                  mode='r+', shape=(capacity,))
+
+    def put(self, match_id, puuids, frames, minutes):
+        """Store a parsed timeline (see parse_timeline). Existing entries are left untouched."""
+        with self._lock:
+            if match_id in self._rows:
+                return self._rows[match_id]
+            row = len(self._participants)
+            if row >= self.capacity:
+                self._frames.flush()
+                self._minutes.flush()
+                self._open(self.capacity * 2)
+            self._frames[row] = frames
+            self._minutes[row] = minutes
+            self._index.write(f"{match_id}\t{','.join(puuids)}\n")
+            self._index.flush()
+            self._rows[match_id] = row
+            self._participants.append(list(puuids))
+            return row
+
+    def put_raw(self, match_id, raw):
+        """Parse and store a timeline payload as received from the API."""
+        return self.put(match_id, *parse_timeline(raw, self.max_minutes))
+
+    def frames(self, match_id):
+        """Zero-copy (10, minutes, fields) view of a match's frames, or None if it isn't stored."""
+        row = self._rows.get(match_id)
+        if row is None:
+            return None
+        return self._frames[row, :, :self._minutes[row]]
+
+    def participants(self, match_id):
+        """PUUIDs in participant order (index 0 is participant 1), or None if not stored."""
+        row = self._rows.get(match_id)
+        return None if row is None else self._participants[row]
+
+    def rows(self, match_ids):
+        """Row numbers for the stored matches among match_ids, in the same order."""
+        return np.fromiter((self._rows[match_id] for match_id in match_ids if match_id in self._rows),
+                           dtype=np.intp)
+
+    def field(self, match_ids, field='gold'):
+        """One field for several matches as a (matches, 10, max_minutes) array."""
+        return self._frames[self.rows(match_ids), :, :, TIMELINE_FIELDS.index(field)]
+
+    def gold_diff(self, match_ids):
+        """Blue-side minus red-side total gold per minute, shaped (matches, max_minutes)."""
+        gold = self.field(match_ids, 'gold')
+        return gold[:, :5].sum(axis=1, dtype=np.int64) - gold[:, 5:].sum(axis=1, dtype=np.int64)
+
+    def flush(self):
+        with self._lock:
+            self._frames.flush()
+            self._minutes.flush()
+
+    def __contains__(self, match_id):
+        return match_id in self._rows
+
+    def __len__(self):
+        return len(self._participants)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_timeline_store():
+    """Return the process-wide timeline store, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TimelineStore()
+    return _store
@@ -0,0 +1,164 @@
+# live_poller.py
+import asyncio
+import collections
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from config.config import LIVE_POLL_INTERVAL
+from data_module.http_client import RiotAPIError, live_client
+
+# How long to wait between attempts while no game is running
+IDLE_RETRY_INTERVAL = 2.0
+
+
+class GoldChange(NamedTuple):
+    game_time: float
+    player: str
+    old: int
+    new: int
+
+class LevelChange(NamedTuple):
+    game_time: float
+    player: str
+    old: int
+    new: int
+
+class ItemChange(NamedTuple):
+    game_time: float
+    player: str
+    added: tuple  # Item IDs
+    removed: tuple
+
+class StatChange(NamedTuple):
+    game_time: float
+    player: str
+    stat: str  # A championStats key, e.g. "attackDamage"
+    old: float
+    new: float
+
+class ScoreChange(NamedTuple):
+    game_time: float
+    player: str
+    stat: str  # kills, deaths, assists, creepScore or wardScore
+    old: float
+    new: float
+
+class GameEvent(NamedTuple):
+    game_time: float
+    name: str  # e.g. "ChampionKill", "DragonKill"
+    data: dict
+
+
+def _player_key(player):
+    return player.get('riotId') or player.get('summonerName')
+
+def _item_ids(player):
+    return collections.Counter(item['itemID'] for item in player.get('items', []))
+
+def diff_snapshots(previous, current, last_event_id=-1):
+    """Typed changes between two `allgamedata` snapshots.
+
+    Gold and champion stats are only reported for the active player (the
+    live client exposes them for no one else). Returns the changes and the
+    ID of the newest game event seen.
+    """
+    game_time = current.get('gameData', {}).get('gameTime', 0.0)
+    changes = []
+
+    if previous is not None:
+        active, active_before = current.get('activePlayer', {}), previous.get('activePlayer', {})
+        name = _player_key(active)
+        gold, gold_before = int(active.get('currentGold', 0)), int(active_before.get('currentGold', 0))
+        if gold != gold_before:
+            changes.append(GoldChange(game_time, name, gold_before, gold))
+        stats_before = active_before.get('championStats', {})
+        for stat, value in active.get('championStats', {}).items():
+            if stats_before.get(stat) != value:
+                changes.append(StatChange(game_time, name, stat, stats_before.get(stat), value))
+
+        players_before = {_player_key(player): player for player in previous.get('allPlayers', [])}
+        for player in current.get('allPlayers', []):
+            name = _player_key(player)
+            before = players_before.get(name)
+            if before is None:
+                continue
+            if player.get('level') != before.get('level'):
+                changes.append(LevelChange(game_time, name, before.get('level'), player.get('level')))
+            items, items_before = _item_ids(player), _item_ids(before)
+            if items != items_before:
+                added = tuple(sorted((items - items_before).elements()))
+                removed = tuple(sorted((items_before - items).elements()))
+                changes.append(ItemChange(game_time, name, added, removed))
+            scores_before = before.get('scores', {})
+            for stat, value in player.get('scores', {}).items():
+                if scores_before.get(stat) != value:
+                    changes.append(ScoreChange(game_time, name, stat, scores_before.get(stat), value))
+
+    for event in current.get('events', {}).get('Events', []):
+        if event.get('EventID', -1) > last_event_id:
+            last_event_id = event['EventID']
+            if previous is not None:  # Don't replay the whole game's history on the first tick
+                changes.append(GameEvent(event.get('EventTime', game_time), event.get('EventName'), event))
+    return changes, last_event_id
+
+
+class LivePoller:
+    """Polls the live client's `allgamedata` once per tick and emits what changed.
+
+    One request per tick over the live client's kept-alive connection
+    replaces the activeplayer/allplayers/playeritems round trips. Changes
+    are delivered to a callback (`run`) or an async iterator (`changes`).
+    """
+
+    def __init__(self, interval=LIVE_POLL_INTERVAL):
+        self.interval = interval
+        self.snapshot = None
+        self._last_event_id = -1
+        self._stop = threading.Event()
+
+    def poll(self):
+        """Fetch one snapshot and return the changes since the last one."""
+        current = live_client().get_json('/liveclientdata/allgamedata')
+        changes, self._last_event_id = diff_snapshots(self.snapshot, current, self._last_event_id)
+        self.snapshot = current
+        return changes
+
+    def _next_changes(self):
+        # Returns (changes, seconds to wait before the next poll)
+        started = time.monotonic()
+        try:
+            changes = self.poll()
+        except (RiotAPIError, ValueError):
+            # No game running, it just ended, or the answer wasn't JSON: start over when one appears
+            self.snapshot, self._last_event_id = None, -1
+            return [], IDLE_RETRY_INTERVAL
+        return changes, max(0.0, self.interval - (time.monotonic() - started))
+
+    def run(self, callback, max_ticks: Optional[int] = None, on_tick=None):
+        """Poll until stop() is called, passing each change to callback.
+
+        `on_tick(snapshot)`, if given, runs once per successful poll, after
+        that tick's changes.
+        """
+        ticks = 0
+        while not self._stop.is_set() and (max_ticks is None or ticks < max_ticks):
+            changes, wait = self._next_changes()
+            for change in changes:
+                callback(change)
+            if on_tick is not None and self.snapshot is not None:
+                on_tick(self.snapshot)
+            ticks += 1
+            self._stop.wait(wait)
+
+    async def changes(self):
+        """Async iterator over changes: `async for change in poller.changes()`."""
+        loop = asyncio.get_running_loop()
+        while not self._stop.is_set():
+            changes, wait = await loop.run_in_executor(None, self._next_changes)
+            for change in changes:
+                yield change
+            await asyncio.sleep(wait)
+
+    def stop(self):
+        self._stop.set()
@@ -1,30 +1,39 @@
-import requests
+import sys
+
 import urllib3
 
+from data_module.http_client import RiotAPIError, live_client
+from data_module.metrics import event
+from live_data_handler.live_poller import LivePoller
+
 # Suppress the InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 def get_live_client_data(endpoint):
-    url = f"https://127.0.0.1:2999/liveclientdata/{endpoint}"
+    # The live client uses a self-signed certificate, so the pooled client skips verification
     try:
-        response = requests.get(url, verify=False)  # Disable verification for local requests
-        response.raise_for_status()  # Raise an error for bad responses
-        return response.json()  # Return JSON data if successful
-    except requests.exceptions.RequestException as e:
-        print(f"HTTP error occurred: {e}")
+        return live_client().get_json(f"/liveclientdata/{endpoint}")  # Return JSON data if successful
+    except RiotAPIError as e:
+        event('http_error', f"HTTP error occurred: {e}", level='error', lookup='live_client', kind=e.kind)
         return None  # Return None if there was an error
 
 def get_players_data():
-    # Fetch the player data
-    players_data = get_live_client_data("activeplayer")
-    if players_data:
-        return players_data  # Return data for the current player
+    # Fetch everything in one request; allplayers entries already include items
+    game_data = get_live_client_data("allgamedata")
+    if not game_data:
+        return None
 
-    # If active player data isn't found, attempt to get player data by riot ID
-    players = get_live_client_data("allplayers")
-    if players:
-        return players  # Return all player data if available
-    return None
+    players = game_data.get('allPlayers', [])
+    active_player = game_data.get('activePlayer')
+    if active_player:
+        # Add the active player's items from their allplayers entry
+        for player in players:
+            if player.get('riotId') == active_player.get('riotId'):
+                active_player = {**active_player, 'items': player.get('items', [])}
+                break
+        return active_player  # Return data for the current player
+
+    return players or None  # Spectating: return all player data if available
 
 def display_player_data(player):
     print("Player Data Structure:", player)  # Debugging output to check the player data structure
@@ -44,8 +53,10 @@ def display_player_data(player):
         print(f"Abilities: {[ability['displayName'] for ability in player['abilities'].values()]}")
         print(f"Runes: {[rune['displayName'] for rune in player['fullRunes']['generalRunes']]}")
         
-        # Fetch items safely
-        items_data = get_live_client_data(f'playeritems?riotId={player["riotId"]}')
+        # Items come with the player data; only fall back to a separate request without them
+        items_data = player.get('items')
+        if items_data is None:
+            items_data = get_live_client_data(f'playeritems?riotId={player["riotId"]}')
         if items_data:
             print(f"Items: {[item['displayName'] for item in items_data]}")
         else:
@@ -55,7 +66,29 @@ def display_player_data(player):
     except KeyError as e:
         print(f"KeyError: {e} - Player data may be missing some fields.")
 
+def watch(win_probability=False):
+    """Print live changes until interrupted, optionally with the win probability after every poll."""
+    poller = LivePoller()
+    scorer = None
+    if win_probability:
+        from data_module.live_scoring import LiveScorer
+        scorer = LiveScorer()
+
+    def on_tick(snapshot):
+        probability = scorer.score(snapshot)
+        if probability is not None:
+            print(f"Win probability: {probability:.1%}")
+
+    try:
+        poller.run(print, on_tick=on_tick if scorer else None)
+    except KeyboardInterrupt:
+        poller.stop()
+
 def main():
+    if '--watch' in sys.argv:
+        watch(win_probability='--win-probability' in sys.argv)
+        return
+
     players_data = get_players_data()
 
     if players_data:
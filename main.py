@@ -1,11 +1,85 @@
-from data_module.data_collecter import retrieve_match_data, get_champion_stats,display_champion_stats
-from data_module.data_processing import save_data, load_data, calculate_metrics
+import argparse
+import atexit
+import importlib
+import threading
 
+from config.config import MATCH_DATASET_PATH, SERVICE_HOST, SERVICE_PORT
 
+# Feature modules are imported when a flow needs them, so `--help` and the
+# prompts come up immediately
 
-    
+
+def run_batch(path, count):
+    """Collect matches for every Riot ID listed in a file into the match dataset."""
+    from data_module.batch_collecter import read_riot_ids, collect_batch
+
+    summary = collect_batch(read_riot_ids(path), count=count)
+    print(f"Players: {summary['players']}")
+    print(f"Unique matches: {summary['unique_matches']} (shared by {summary['player_matches']} player matches)")
+    print(f"Rows written to {MATCH_DATASET_PATH}: {summary['rows_written']}")
+
+def run_crawl(path, max_matches):
+    """Crawl outward from the Riot IDs in a file, resuming any earlier crawl."""
+    from config.config import CRAWL_DATASET_PATH
+    from data_module.batch_collecter import read_riot_ids
+    from data_module.crawler import Crawler
+
+    crawler = Crawler()
+    print(f"Queued {crawler.seed(read_riot_ids(path))} new seed players.")
+    summary = crawler.run(max_matches=max_matches)
+    crawler.close()
+    print(f"Players crawled: {summary['players_crawled']} ({summary['frontier']} still queued)")
+    print(f"Matches: {summary['matches']}")
+    print(f"Rows written to {CRAWL_DATASET_PATH}: {summary['rows']}")
+
+def run_monitor(path):
+    """Watch the players listed in a file for games starting and ending, until interrupted."""
+    from data_module.batch_collecter import read_riot_ids
+    from data_module.spectator_monitor import SpectatorMonitor
+
+    monitor = SpectatorMonitor()
+    print(f"Watching {monitor.watch(read_riot_ids(path))} players. Press Ctrl+C to stop.")
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        monitor.stop()
 
 def main():
+    parser = argparse.ArgumentParser(description="League of Legends match analytics")
+    parser.add_argument('--batch', metavar='FILE', help="file with one Riot ID (GameName#TAG) per line")
+    parser.add_argument('--count', type=int, default=20, help="matches per player in batch mode")
+    parser.add_argument('--crawl', metavar='FILE',
+                        help="crawl the participant graph breadth-first from the Riot IDs in FILE (resumable)")
+    parser.add_argument('--max-matches', type=int, help="stop the crawl after this many new matches")
+    parser.add_argument('--monitor', metavar='FILE',
+                        help="report games starting and ending for the Riot IDs in FILE, ingesting finished games")
+    parser.add_argument('--serve', action='store_true', help="run as a long-lived local API server")
+    parser.add_argument('--host', default=SERVICE_HOST, help="address to serve on")
+    parser.add_argument('--port', type=int, default=SERVICE_PORT, help="port to serve on")
+    parser.add_argument('--socket', metavar='PATH', help="serve on a Unix socket instead of TCP")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write request metrics on exit (JSON for .json files, Prometheus text otherwise)")
+    args = parser.parse_args()
+    if args.metrics:
+        from data_module.metrics import write_metrics
+        atexit.register(write_metrics, args.metrics)
+    if args.serve:
+        from data_module.service import serve
+        serve(args.host, args.port, args.socket)
+        return
+    if args.batch:
+        run_batch(args.batch, args.count)
+        return
+    if args.crawl:
+        run_crawl(args.crawl, args.max_matches)
+        return
+    if args.monitor:
+        run_monitor(args.monitor)
+        return
+
+    # Import the collector in the background while the user types
+    threading.Thread(target=importlib.import_module, args=('data_module.data_collecter',), daemon=True).start()
+
     # Prompt for user inputs
     region = input("Enter the region (e.g., na1): ")
     game_name = input("Enter the summoner name: ")
@@ -31,24 +105,29 @@ def main():
     print("------------------------------------------------------------------")
     match option:
         case "CHAMPION MASTERY":
+            from data_module.data_collecter import display_champion_stats
+
             # Display champion stats
             print("\nRetrieving champion mastery and win rate data...")
-            display_champion_stats(game_name, tag_line)
+            display_champion_stats(game_name, tag_line, from_rollups=True)
         case "LIVE DATA":
+            from data_module.data_collecter import retrieve_match_data
+            from data_module.data_processing import save_data, load_data, calculate_metrics
+
              # Retrieve match data
             #assigns the information from the rmdata function in data_collector.py and puts it in match_data.
             match_data = retrieve_match_data(game_name, tag_line, count)
     
-            if match_data is None:
+            if not match_data:  # None on an error, [] for a player without matches
                 print("No match data retrieved.")
                 return
     
-            # Save match data to CSV
-            save_data(match_data, 'match_history.csv')
-            print("Match data saved to match_history.csv")
+            # Append match data to the match dataset
+            save_data(match_data, MATCH_DATASET_PATH)
+            print(f"Match data saved to {MATCH_DATASET_PATH}")
     
-            # Load and analyze match data
-            loaded_data = load_data('match_history.csv')
+            # Load and analyze this player's matches, reading only the columns we need
+            loaded_data = load_data(MATCH_DATASET_PATH, columns=['win', 'duration'], puuid=match_data[0].puuid)
             win_rate, average_duration = calculate_metrics(loaded_data)
     
             print(f"Win Rate: {win_rate:.2f}%")